@@ -1,3 +1,66 @@
-from django.test import TestCase
+import pytest
+from apps.evaluations.models import Evaluation
 
-# Create your tests here.
+
+@pytest.fixture
+def evaluation(completed_internship):
+    return Evaluation.objects.create(internship=completed_internship, comments="Reliable\nKeen to learn")
+
+
+@pytest.mark.django_db
+def test_evaluation_pdf_reuses_the_static_first_page(client, evaluation, settings):
+    from reportlab import rl_config
+    from apps.evaluations import utils
+
+    response = client.post('/api/auth/login/', {"email": "student@example.com", "password": "password123"})
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    utils._first_page_layout.cache_clear()
+    for _ in range(2):
+        response = client.get(f'/api/evaluations/{evaluation.internship_id}/download/')
+        assert response.status_code == 200
+    assert utils._first_page_layout.cache_info().misses == 1
+
+    # The static text is a single text object, drawn with fonts registered in each document
+    utils._first_page_layout.cache_clear()
+    compression, rl_config.pageCompression = rl_config.pageCompression, 0
+    try:
+        pdf = utils.generate_evaluation_pdf(evaluation).getvalue()
+    finally:
+        rl_config.pageCompression = compression
+    assert pdf.count(b'(REPUBLIC OF CAMEROON) Tj') == 1
+    assert pdf.count(b'(INTERNSHIP EVALUATION FORM) Tj') == 1
+    assert b'/BaseFont /Helvetica-Bold' in pdf
+    assert b'(Name: Student User) Tj' in pdf
+    assert utils._first_page_layout.cache_info().misses == 1
+
+
+@pytest.mark.django_db
+def test_evaluation_pdf_is_stored_once_per_version(client, evaluation, settings, mocker):
+    import os
+    from apps.evaluations import utils
+    from apps.evaluations.models import EvaluationTemplate
+    from apps.evaluation_categories.models import EvaluationCategory
+
+    render = mocker.spy(utils, 'generate_evaluation_pdf')
+    response = client.post('/api/auth/login/', {"email": "student@example.com", "password": "password123"})
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+    url = f'/api/evaluations/{evaluation.internship_id}/download/'
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content).startswith(b'%PDF')
+    etag = response['ETag']
+    assert client.get(url)['ETag'] == etag
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert render.call_count == 1
+
+    # A new category replaces the stored file
+    template = EvaluationTemplate.objects.create(name="Punctuality", order=1)
+    EvaluationCategory.objects.create(evaluation=evaluation, template=template)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert render.call_count == 2
+    assert os.listdir(os.path.join(settings.MEDIA_ROOT, 'evaluation_pdfs')) == [
+        os.path.basename(utils.render_cached_evaluation_pdf(evaluation.id))
+    ]
@@ -1,170 +1,241 @@
+from functools import lru_cache
 from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfgen import canvas
 from io import BytesIO
+from django.db.models import Count, Max
 from apps.evaluations.models import Evaluation
-
-
-def generate_evaluation_pdf(evaluation: Evaluation):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
+from apps.evaluation_category_subfields.models import EvaluationCategorySubfield
+from apps.utils.media_cache import cached_media_file, content_version
+
+
+STAFF_INFO = [
+    "Director : Fidelis Cho-Ngwa, Professor",
+    "Deputy Director : Nfah Mbaka Eustace, Assoc. Professor",
+    "HD/ Academic Affairs, Research and Cooperation: Fozao Kennedy Folepai, Assoc. Professor",
+    "HD/ Student Records, Studies and Internship : Fautso Kuiate Gaetan, Assoc. Professor",
+    "HD/ Continuous and Distant Training : Dr. Mih Thomas Attia",
+    "HD/ Administrative and Financial Affairs : Mrs. Bin Marcella Njang"
+]
+
+
+@lru_cache(maxsize=1)
+def _first_page_layout():
+    """
+    Everything on the first page above the evaluation categories, laid out once per process.
+    Returns the static lines as `(font, size, x, y, text)`, grouped by font and with centred lines
+    already measured, the `(font, size, x, y)` of each per-evaluation field, and the y where the
+    categories start. The result is shared, so callers must not change it.
+    """
     width, height = A4
+    lines = []
+    fields = {}
 
-    # Header with official information
-    def draw_header():
-        y = height - 30
+    def text(font, size, x, y, value, centred=False):
+        if centred:
+            x -= pdfmetrics.stringWidth(value, font, size) / 2
+        lines.append((font, size, x, y, value))
 
-        # Republic info
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(50, y, "REPUBLIC OF CAMEROON")
-        c.drawString(400, y, "REPUBLIQUE DU CAMEROUN")
-        y -= 15
-        c.setFont("Helvetica", 9)
-        c.drawString(50, y, "Peace – Work – Fatherland")
-        c.drawString(400, y, "Paix – Travail - Patrie")
-        y -= 30
-
-        # Ministry info
-        c.setFont("Helvetica-Bold", 9)
-        c.drawString(50, y, "MINISTRY OF HIGHER EDUCATION")
-        c.drawString(350, y, "MINISTERE DE L'ENSEIGNEMENT SUPERIEUR")
-        y -= 30
-
-        # University info
-        c.setFont("Helvetica-Bold", 12)
-        c.drawCentredString(width / 2, y, "THE UNIVERSITY OF BAMENDA")
-        y -= 15
-        c.setFont("Helvetica", 10)
-        c.drawCentredString(width / 2, y, "P.O. Box 39, Bambili")
-        y -= 12
-        c.drawCentredString(width / 2, y, "Fax (237) 233 366 030 - Website: www.uniba.cm")
-        y -= 15
-        c.setFont("Helvetica-Bold", 10)
-        c.drawCentredString(width / 2, y, "L'UNIVERSITE DE BAMENDA")
-        y -= 15
-        c.setFont("Helvetica", 10)
-        c.drawCentredString(width / 2, y, "B.P. 39, Bambili")
-        y -= 12
-        c.drawCentredString(width / 2, y, "Fax (237) 233 366 030 - Website: www.uniba.cm")
-        y -= 30
+    # Header with official information
+    y = height - 30
 
-        # Institute info
-        c.setFont("Helvetica-Bold", 11)
-        c.drawString(50, y, "National Higher Polytechnic Institute (NAHPI)")
-        c.drawString(350, y, "Ecole Nationale Supérieure Polytechnique (ENSPB)")
-        y -= 15
-        c.setFont("Helvetica", 10)
-        c.drawString(50, y, "(School of Engineering)")
-        c.drawString(350, y, "(Ecole d'Ingénieurs)")
-        y -= 25
+    # Republic info
+    text("Helvetica-Bold", 10, 50, y, "REPUBLIC OF CAMEROON")
+    text("Helvetica-Bold", 10, 400, y, "REPUBLIQUE DU CAMEROUN")
+    y -= 15
+    text("Helvetica", 9, 50, y, "Peace – Work – Fatherland")
+    text("Helvetica", 9, 400, y, "Paix – Travail - Patrie")
+    y -= 30
 
-        # Staff info
-        c.setFont("Helvetica", 8)
-        staff_info = [
-            "Director : Fidelis Cho-Ngwa, Professor",
-            "Deputy Director : Nfah Mbaka Eustace, Assoc. Professor",
-            "HD/ Academic Affairs, Research and Cooperation: Fozao Kennedy Folepai, Assoc. Professor",
-            "HD/ Student Records, Studies and Internship : Fautso Kuiate Gaetan, Assoc. Professor",
-            "HD/ Continuous and Distant Training : Dr. Mih Thomas Attia",
-            "HD/ Administrative and Financial Affairs : Mrs. Bin Marcella Njang"
-        ]
+    # Ministry info
+    text("Helvetica-Bold", 9, 50, y, "MINISTRY OF HIGHER EDUCATION")
+    text("Helvetica-Bold", 9, 350, y, "MINISTERE DE L'ENSEIGNEMENT SUPERIEUR")
+    y -= 30
 
-        for info in staff_info:
-            c.drawString(50, y, info)
-            y -= 12
+    # University info
+    text("Helvetica-Bold", 12, width / 2, y, "THE UNIVERSITY OF BAMENDA", centred=True)
+    y -= 15
+    text("Helvetica", 10, width / 2, y, "P.O. Box 39, Bambili", centred=True)
+    y -= 12
+    text("Helvetica", 10, width / 2, y, "Fax (237) 233 366 030 - Website: www.uniba.cm", centred=True)
+    y -= 15
+    text("Helvetica-Bold", 10, width / 2, y, "L'UNIVERSITE DE BAMENDA", centred=True)
+    y -= 15
+    text("Helvetica", 10, width / 2, y, "B.P. 39, Bambili", centred=True)
+    y -= 12
+    text("Helvetica", 10, width / 2, y, "Fax (237) 233 366 030 - Website: www.uniba.cm", centred=True)
+    y -= 30
 
-        return y - 30
+    # Institute info
+    text("Helvetica-Bold", 11, 50, y, "National Higher Polytechnic Institute (NAHPI)")
+    text("Helvetica-Bold", 11, 350, y, "Ecole Nationale Supérieure Polytechnique (ENSPB)")
+    y -= 15
+    text("Helvetica", 10, 50, y, "(School of Engineering)")
+    text("Helvetica", 10, 350, y, "(Ecole d'Ingénieurs)")
+    y -= 25
 
-    y = draw_header()
+    # Staff info
+    for info in STAFF_INFO:
+        text("Helvetica", 8, 50, y, info)
+        y -= 12
+    y -= 30
 
     # Title
-    c.setFont("Helvetica-Bold", 14)
-    c.drawCentredString(width / 2, y, "INTERNSHIP EVALUATION FORM")
+    text("Helvetica-Bold", 14, width / 2, y, "INTERNSHIP EVALUATION FORM", centred=True)
     y -= 20
-    c.setFont("Helvetica", 10)
-    c.drawCentredString(width / 2, y,
-                        "This evaluation form is to be filled by the field supervisor, stamped with the official seal and returned to the institute")
+    text("Helvetica", 10, width / 2, y,
+         "This evaluation form is to be filled by the field supervisor, stamped with the official seal and returned to the institute",
+         centred=True)
     y -= 10
-    c.drawCentredString(width / 2, y, "in a sealed envelop.")
+    text("Helvetica", 10, width / 2, y, "in a sealed envelop.", centred=True)
     y -= 30
 
     # Section A: INTERN DETAILS
-    internship = evaluation.internship
-    student = internship.student.user
-
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, y, "A. INTERN DETAILS")
+    text("Helvetica-Bold", 12, 50, y, "A. INTERN DETAILS")
     y -= 20
-
-    c.setFont("Helvetica", 11)
-    c.drawString(50, y, f"Name: {getattr(student, 'full_name', 'N/A')}")
-    y -= 15
-    c.drawString(50, y, f"Intern ID: {internship.student.matricule_num}")
-    y -= 15
-    c.drawString(50, y, f"Programme: {getattr(internship.student, 'programme', 'N/A')}")
-    y -= 15
-    c.drawString(50, y, f"Internship Duration From: {internship.start_date} To: {internship.end_date}")
+    for field in ('name', 'intern_id', 'programme'):
+        fields[field] = ("Helvetica", 11, 50, y)
+        y -= 15
+    fields['duration'] = ("Helvetica", 11, 50, y)
     y -= 25
 
     # Section B: COMPANY DETAILS
-    company = internship.company
-    supervisor = internship.supervisor
-
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, y, "B. COMPANY DETAILS")
+    text("Helvetica-Bold", 12, 50, y, "B. COMPANY DETAILS")
     y -= 20
-
-    c.setFont("Helvetica", 11)
-    c.drawString(50, y, f"Company's Name: {company.name}")
-    y -= 15
-    c.drawString(50, y, f"Department/Division: {getattr(company, 'department', 'N/A')}")
-    y -= 15
-    c.drawString(50, y, f"Field Supervisor Name: {getattr(supervisor.user, 'full_name', 'N/A')}")
-    y -= 15
-    c.drawString(50, y, f"Contact Number: {getattr(supervisor.user, 'phone', 'N/A')}")
-    y -= 15
-    c.drawString(50, y, f"Designation: {getattr(supervisor, 'designation', 'N/A')}")
-    c.drawString(350, y, f"Email Address: {supervisor.user.email}")
+    for field in ('company', 'division', 'supervisor', 'contact'):
+        fields[field] = ("Helvetica", 11, 50, y)
+        y -= 15
+    fields['designation'] = ("Helvetica", 11, 50, y)
+    fields['email'] = ("Helvetica", 11, 350, y)
     y -= 25
 
     # Section C: JOB DESCRIPTION
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, y, "C. JOB DESCRIPTION")
+    text("Helvetica-Bold", 12, 50, y, "C. JOB DESCRIPTION")
     y -= 20
-
-    c.setFont("Helvetica", 11)
-    job_description = getattr(internship, 'job_description', 'No job description provided.')
-    job_desc_lines = job_description.split('\n')[:4]  # Take first 4 lines
-    for i, line in enumerate(job_desc_lines, 1):
-        c.drawString(50, y, f"{i}. {line}")
-        y -= 15
-
-    # Fill remaining lines if less than 4
-    for i in range(len(job_desc_lines) + 1, 5):
-        c.drawString(50, y, f"{i}.")
+    for i in range(1, 5):
+        fields[f'job_{i}'] = ("Helvetica", 11, 50, y)
         y -= 15
-
     y -= 10
 
     # Section D: EVALUATION
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, y, "D. EVALUATION")
+    text("Helvetica-Bold", 12, 50, y, "D. EVALUATION")
     y -= 20
-
-    c.setFont("Helvetica", 10)
-    c.drawString(50, y,
-                 "Evaluation of student's qualities during his/her internship according to the point breakdown below. Select one evaluation")
+    text("Helvetica", 10, 50, y,
+         "Evaluation of student's qualities during his/her internship according to the point breakdown below. Select one evaluation")
     y -= 12
-    c.drawString(50, y, "level for each area and assign a score against each item listed.")
+    text("Helvetica", 10, 50, y, "level for each area and assign a score against each item listed.")
     y -= 20
 
     # Point Breakdown
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(50, y, "Point Breakdown")
+    text("Helvetica-Bold", 11, 50, y, "Point Breakdown")
     y -= 15
-    c.setFont("Helvetica", 10)
-    c.drawString(50, y, "Poor : 1 pt    Underdevelop : 2 pts    Average : 3 pts    Good : 4 pts    Outstanding : 5 pts")
+    text("Helvetica", 10, 50, y, "Poor : 1 pt    Underdevelop : 2 pts    Average : 3 pts    Good : 4 pts    Outstanding : 5 pts")
     y -= 25
 
+    # Grouped by font, so each font is selected once
+    return tuple(sorted(lines, key=lambda line: line[:2])), fields, y
+
+
+def _draw_first_page_static_text(c):
+    """Draw the static first-page lines as a single text object."""
+    lines, _, _ = _first_page_layout()
+    text_object = c.beginText()
+    current_font = None
+    for font, size, x, y, value in lines:
+        if (font, size) != current_font:
+            text_object.setFont(font, size)
+            current_font = (font, size)
+        text_object.setTextOrigin(x, y)
+        text_object.textOut(value)
+    # Saving the state keeps the fonts set inside from leaking into the canvas's own text state
+    c.saveState()
+    c.drawText(text_object)
+    c.restoreState()
+
+
+def evaluation_pdf_queryset():
+    return Evaluation.objects.select_related(
+        'internship__student__user',
+        'internship__company',
+        'internship__supervisor__user'
+    ).prefetch_related(
+        'categories__template',
+        'categories__subfields__template'
+    )
+
+
+def evaluation_pdf_version(evaluation: Evaluation):
+    """
+    Version of the rendered evaluation PDF. It changes when the evaluation, its categories or
+    their scores change, or when the intern, company or supervisor details printed on it do.
+    """
+    internship = evaluation.internship
+    categories = evaluation.categories.aggregate(
+        count=Count('id'), last_updated=Max('updated_at'), templates_updated=Max('template__updated_at')
+    )
+    subfields = EvaluationCategorySubfield.objects.filter(category__evaluation=evaluation).aggregate(
+        count=Count('id'), last_updated=Max('updated_at'), templates_updated=Max('template__updated_at')
+    )
+    return content_version(
+        evaluation.id, evaluation.updated_at, evaluation.total_score,
+        internship.updated_at, internship.student.updated_at, internship.student.user.updated_at,
+        internship.company.updated_at, internship.supervisor.updated_at, internship.supervisor.user.updated_at,
+        categories['count'], categories['last_updated'], categories['templates_updated'],
+        subfields['count'], subfields['last_updated'], subfields['templates_updated'],
+    )
+
+
+def render_cached_evaluation_pdf(evaluation_id):
+    """Path of the current cached PDF of an evaluation, rendering it first if needed."""
+    evaluation = evaluation_pdf_queryset().get(id=evaluation_id)
+    return cached_media_file('evaluation_pdfs', f"evaluation_{evaluation.id}", evaluation_pdf_version(evaluation),
+                             lambda: generate_evaluation_pdf(evaluation))
+
+
+def generate_evaluation_pdf(evaluation: Evaluation):
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+
+    # Header, title, section headings and point breakdown never change
+    _, fields, y = _first_page_layout()
+    _draw_first_page_static_text(c)
+
+    def draw_field(field, value):
+        font, size, x, field_y = fields[field]
+        c.setFont(font, size)
+        c.drawString(x, field_y, value)
+
+    # Section A: INTERN DETAILS
+    internship = evaluation.internship
+    student = internship.student.user
+
+    draw_field('name', f"Name: {getattr(student, 'full_name', 'N/A')}")
+    draw_field('intern_id', f"Intern ID: {internship.student.matricule_num}")
+    draw_field('programme', f"Programme: {getattr(internship.student, 'programme', 'N/A')}")
+    draw_field('duration', f"Internship Duration From: {internship.start_date} To: {internship.end_date}")
+
+    # Section B: COMPANY DETAILS
+    company = internship.company
+    supervisor = internship.supervisor
+
+    draw_field('company', f"Company's Name: {company.name}")
+    draw_field('division', f"Department/Division: {getattr(company, 'department', 'N/A')}")
+    draw_field('supervisor', f"Field Supervisor Name: {getattr(supervisor.user, 'full_name', 'N/A')}")
+    draw_field('contact', f"Contact Number: {getattr(supervisor.user, 'phone', 'N/A')}")
+    draw_field('designation', f"Designation: {getattr(supervisor, 'designation', 'N/A')}")
+    draw_field('email', f"Email Address: {supervisor.user.email}")
+
+    # Section C: JOB DESCRIPTION
+    job_description = getattr(internship, 'job_description', 'No job description provided.')
+    job_desc_lines = job_description.split('\n')[:4]  # Take first 4 lines
+    for i, line in enumerate(job_desc_lines, 1):
+        draw_field(f'job_{i}', f"{i}. {line}")
+
+    # Fill remaining lines if less than 4
+    for i in range(len(job_desc_lines) + 1, 5):
+        draw_field(f'job_{i}', f"{i}.")
+
     # Evaluation Categories - Display all categories with proper formatting
     categories = evaluation.categories.all().order_by('template__order')
 
@@ -1,6 +1,9 @@
 from django.contrib import admin
 
-from apps.internships.models import Internship, InternshipRequest
+from apps.internships.models import Internship, InternshipRequest, ReportJob, LLMResponseCache, LLMCallRecord
 
 admin.site.register(Internship)
-admin.site.register(InternshipRequest)
\ No newline at end of file
+admin.site.register(InternshipRequest)
+admin.site.register(ReportJob)
+admin.site.register(LLMResponseCache)
+admin.site.register(LLMCallRecord)
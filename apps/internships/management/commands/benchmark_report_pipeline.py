@@ -0,0 +1,70 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from apps.utils.internship_report import REPORT_SECTIONS, InternshipReportBuilder, report_internships
+
+
+class Command(BaseCommand):
+    help = 'Benchmark report generation against the local fake LLM, without network access'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--internship', type=int, action='append', dest='internships',
+                            help='Internship id to generate a report for (repeatable). Defaults to completed internships')
+        parser.add_argument('--limit', type=int, default=10, help='Number of completed internships to use')
+        parser.add_argument('--rounds', type=int, default=1, help='Times each report is generated')
+        parser.add_argument('--latency', type=float, default=1.0, help='Fake model latency in seconds')
+        parser.add_argument('--jitter', type=float, default=0.3, help='Latency jitter in seconds')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of calls failing with a 500 error')
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of calls answered with a 429')
+        parser.add_argument('--concurrency', type=int, help='Override REPORT_SECTION_CONCURRENCY')
+        parser.add_argument('--mode', choices=['per_section', 'structured'], help='Override REPORT_GENERATION_MODE')
+
+    def handle(self, *args, **options):
+        internships = report_internships().filter(status='completed')
+        if options['internships']:
+            internships = internships.filter(id__in=options['internships'])
+        internships = list(internships[:options['limit']])
+        if not internships:
+            raise CommandError('No completed internships to benchmark.')
+
+        overrides = {
+            'LLM_BACKEND': 'fake',
+            'FAKE_LLM_LATENCY': options['latency'],
+            'FAKE_LLM_JITTER': options['jitter'],
+            'FAKE_LLM_ERROR_RATE': options['error_rate'],
+            'FAKE_LLM_RATE_LIMIT_RATE': options['rate_limit_rate'],
+        }
+        if options['concurrency']:
+            overrides['REPORT_SECTION_CONCURRENCY'] = options['concurrency']
+        if options['mode']:
+            overrides['REPORT_GENERATION_MODE'] = options['mode']
+
+        durations = []
+        failures = 0
+        sections = 0
+        started = time.perf_counter()
+        with override_settings(**overrides), transaction.atomic():
+            for _ in range(options['rounds']):
+                for internship in internships:
+                    call_started = time.perf_counter()
+                    try:
+                        # Skip the cache so every round pays for the model calls
+                        InternshipReportBuilder(internship, use_cache=False).build()
+                        sections += len(REPORT_SECTIONS)
+                    except Exception as e:
+                        failures += 1
+                        self.stdout.write(self.style.WARNING(f'Internship {internship.id}: {e}'))
+                    durations.append(time.perf_counter() - call_started)
+            # Leave no cache entries or narratives behind
+            transaction.set_rollback(True)
+        elapsed = time.perf_counter() - started
+
+        durations.sort()
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        self.stdout.write(f'Reports: {len(durations)} ({failures} failed) in {elapsed:.2f}s')
+        self.stdout.write(f'Throughput: {len(durations) / elapsed:.2f} reports/s, {sections / elapsed:.2f} sections/s')
+        self.stdout.write(f'Latency: p50 {statistics.median(durations):.2f}s, p95 {p95:.2f}s, max {durations[-1]:.2f}s')
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.internships.models import LLMCallRecord
+
+
+def percentile(values, share):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = 'Report p50/p95 latency and token usage of LLM calls per report section'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Only include calls from the last N days')
+        parser.add_argument('--internship', type=int, help='Only include calls for this internship')
+
+    def handle(self, *args, **options):
+        records = LLMCallRecord.objects.filter(created_at__gte=timezone.now() - timedelta(days=options['days']))
+        if options['internship']:
+            records = records.filter(internship_id=options['internship'])
+
+        by_section = {}
+        for section, outcome, latency, prompt_tokens, response_tokens in records.values_list(
+            'section', 'outcome', 'latency', 'prompt_tokens', 'response_tokens'
+        ).order_by('latency'):
+            stats = by_section.setdefault(section, {'calls': 0, 'failed': 0, 'latencies': [],
+                                                    'prompt_tokens': 0, 'response_tokens': 0})
+            stats['calls'] += 1
+            if outcome != 'success':
+                stats['failed'] += 1
+                continue
+            # Latency percentiles only cover answered calls; refused and failed ones would skew them
+            stats['latencies'].append(latency)
+            stats['prompt_tokens'] += prompt_tokens or 0
+            stats['response_tokens'] += response_tokens or 0
+
+        if not by_section:
+            self.stdout.write('No LLM calls recorded.')
+            return
+
+        self.stdout.write(f"{'Section':<20} {'Calls':>6} {'Failed':>6} {'p50 (s)':>8} {'p95 (s)':>8} "
+                          f"{'Prompt tok':>11} {'Resp tok':>9} {'Avg tok':>8}")
+        # Most expensive sections first
+        for section, stats in sorted(by_section.items(),
+                                     key=lambda item: item[1]['prompt_tokens'] + item[1]['response_tokens'],
+                                     reverse=True):
+            answered = len(stats['latencies'])
+            total_tokens = stats['prompt_tokens'] + stats['response_tokens']
+            self.stdout.write(
+                f"{section or '-':<20} {stats['calls']:>6} {stats['failed']:>6} "
+                f"{percentile(stats['latencies'], 0.5):>8.2f} {percentile(stats['latencies'], 0.95):>8.2f} "
+                f"{stats['prompt_tokens']:>11} {stats['response_tokens']:>9} "
+                f"{total_tokens // answered if answered else 0:>8}"
+            )
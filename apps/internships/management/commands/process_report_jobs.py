@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.utils.internship_report import claim_next_report_job, requeue_stale_report_jobs, run_report_job
+
+
+class Command(BaseCommand):
+    help = 'Run a worker that processes queued internship report generation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process the jobs currently queued, then exit')
+        parser.add_argument('--sleep', type=int, default=settings.REPORT_JOB_POLL_INTERVAL,
+                            help='Seconds to wait between polls when the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Report worker started')
+        while True:
+            close_old_connections()
+            requeue_stale_report_jobs()
+
+            job = claim_next_report_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write(f'Processing {job.get_kind_display().lower()} job {job.id} for internship {job.internship_id}')
+            job = run_report_job(job)
+            if job.status == 'completed':
+                self.stdout.write(self.style.SUCCESS(f'Report job {job.id} completed'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Report job {job.id} failed: {job.error}'))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 12:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('internships', '0010_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMResponseCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('model_name', models.CharField(max_length=100)),
+                ('section', models.CharField(max_length=100)),
+                ('content', models.TextField()),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'LLM Response Cache Entry',
+                'verbose_name_plural': 'LLM Response Cache',
+            },
+        ),
+        migrations.AddField(
+            model_name='reportjob',
+            name='use_cache',
+            field=models.BooleanField(default=True),
+        ),
+    ]
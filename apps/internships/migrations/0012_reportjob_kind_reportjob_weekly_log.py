@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-18 12:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('internships', '0011_llmresponsecache_reportjob_use_cache'),
+        ('weekly_logs', '0006_weeklylog_narrative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='kind',
+            field=models.CharField(choices=[('report', 'Internship Report'), ('week_narrative', 'Week Narrative')], default='report', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='reportjob',
+            name='weekly_log',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to='weekly_logs.weeklylog'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 12:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('internships', '0012_reportjob_kind_reportjob_weekly_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCallRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('section', models.CharField(db_index=True, max_length=50)),
+                ('model_name', models.CharField(max_length=100)),
+                ('attempt', models.PositiveSmallIntegerField(default=1)),
+                ('prompt_chars', models.PositiveIntegerField(default=0)),
+                ('response_chars', models.PositiveIntegerField(default=0)),
+                ('prompt_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('response_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('total_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('latency', models.FloatField(default=0)),
+                ('outcome', models.CharField(choices=[('success', 'Success'), ('rate_limited', 'Rate Limited'), ('timeout', 'Timeout'), ('error', 'Error'), ('unavailable', 'Unavailable')], max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('internship', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='llm_calls', to='internships.internship')),
+            ],
+            options={
+                'verbose_name': 'LLM Call Record',
+                'verbose_name_plural': 'LLM Call Records',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
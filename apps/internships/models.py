@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
@@ -67,4 +68,88 @@ class InternshipRequest(BaseModel):
         verbose_name_plural = "Internship Requests"
 
     def __str__(self):
-        return f"{self.student} - {self.company} ({self.status})"
\ No newline at end of file
+        return f"{self.student} - {self.company} ({self.status})"
+
+
+class ReportJob(BaseModel):
+    KIND_CHOICES = [
+        ('report', 'Internship Report'),
+        ('week_narrative', 'Week Narrative'),
+    ]
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='report')
+    internship = models.ForeignKey(Internship, on_delete=models.CASCADE, related_name='report_jobs')
+    weekly_log = models.ForeignKey('weekly_logs.WeeklyLog', on_delete=models.CASCADE, null=True, blank=True,
+                                   related_name='report_jobs')  # Only set for week narrative jobs
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress = models.JSONField(default=dict, blank=True)  # section name -> pending/running/cached/completed/failed
+    use_cache = models.BooleanField(default=True)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = "Report Job"
+        verbose_name_plural = "Report Jobs"
+
+    def __str__(self):
+        return f"Report job {self.id} - {self.internship} ({self.status})"
+
+
+class LLMResponseCache(BaseModel):
+    """Generated text keyed by a hash of the model name, prompt and the internship it was generated for."""
+    key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=100)
+    section = models.CharField(max_length=100)
+    content = models.TextField()
+    size = models.PositiveIntegerField(default=0)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = "LLM Response Cache Entry"
+        verbose_name_plural = "LLM Response Cache"
+
+    def __str__(self):
+        return f"{self.section} ({self.model_name}) - {self.key[:12]}"
+
+
+class LLMCallRecord(BaseModel):
+    """One attempt at a model call, with its size, token usage, latency and outcome."""
+    OUTCOME_CHOICES = [
+        ('success', 'Success'),
+        ('rate_limited', 'Rate Limited'),
+        ('timeout', 'Timeout'),
+        ('error', 'Error'),
+        ('unavailable', 'Unavailable'),  # Refused by the open circuit breaker, never sent
+    ]
+
+    internship = models.ForeignKey(Internship, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='llm_calls')
+    section = models.CharField(max_length=50, db_index=True)
+    model_name = models.CharField(max_length=100)
+    attempt = models.PositiveSmallIntegerField(default=1)
+    prompt_chars = models.PositiveIntegerField(default=0)
+    response_chars = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    response_tokens = models.PositiveIntegerField(null=True, blank=True)
+    total_tokens = models.PositiveIntegerField(null=True, blank=True)
+    latency = models.FloatField(default=0)  # Seconds
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "LLM Call Record"
+        verbose_name_plural = "LLM Call Records"
+
+    def __str__(self):
+        return f"{self.section} ({self.model_name}) - {self.outcome} in {self.latency:.2f}s"
@@ -1,5 +1,11 @@
+import json
 import pytest
-from apps.internships.models import Internship
+from io import BytesIO, StringIO
+from unittest import mock
+from django.core.management import call_command
+from apps.internships.models import Internship, ReportJob, LLMResponseCache
+from apps.utils.internship_report import REPORT_SECTIONS, run_report_job
+from apps.utils.llm_cache import cache_response, evict_cached_responses, get_cached_response
 from apps.users.models import User
 from apps.companies.models import CompanyAdmin
 from django.utils import timezone
@@ -231,4 +237,446 @@ def test_forbidden_access_student(client, student_user, internship):
     # Try bulk update
     response = client.patch(f'/api/internships/{company_id}/bulk-update/',
                             {"status": "completed"}, format='json')
-    assert response.status_code == 403
\ No newline at end of file
+    assert response.status_code == 403
+
+@pytest.mark.django_db
+def test_generate_report_queues_job(client, completed_internship, gemini):
+    response = client.post('/api/auth/login/', {"email": "student@example.com", "password": "password123"})
+    token = response.data['access']
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    response = client.post(f'/api/internships/{completed_internship.id}/generate-report/')
+
+    assert response.status_code == 202
+    assert response.data['status'] == 'queued'
+    assert set(response.data['progress'].values()) == {'pending'}
+    gemini.GenerativeModel.return_value.generate_content.assert_not_called()
+
+    # Posting again while the job is queued returns the same job
+    response2 = client.post(f'/api/internships/{completed_internship.id}/generate-report/')
+    assert response2.data['job_id'] == response.data['job_id']
+    assert ReportJob.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_report_worker_completes_job(client, completed_internship, gemini):
+    job = ReportJob.objects.create(internship=completed_internship)
+
+    call_command('process_report_jobs', '--once', stdout=StringIO())
+
+    job.refresh_from_db()
+    completed_internship.refresh_from_db()
+    assert job.status == 'completed'
+    assert job.progress == {section: 'completed' for section in REPORT_SECTIONS}
+    assert completed_internship.report_generated
+    assert completed_internship.report_file.name.startswith('internship_reports/')
+
+    response = client.post('/api/auth/login/', {"email": "student@example.com", "password": "password123"})
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+    response = client.get(f'/api/internships/{completed_internship.id}/report-jobs/{job.id}/')
+    assert response.status_code == 200
+    assert response.data['status'] == 'completed'
+    assert response.data['file_path'] == completed_internship.report_file.name
+
+
+@pytest.mark.django_db
+def test_report_worker_records_failure(completed_internship, gemini):
+    gemini.GenerativeModel.return_value.generate_content.side_effect = RuntimeError("quota exceeded")
+    job = ReportJob.objects.create(internship=completed_internship)
+
+    call_command('process_report_jobs', '--once', stdout=StringIO())
+
+    job.refresh_from_db()
+    assert job.status == 'failed'
+    assert 'quota exceeded' in job.error
+    assert job.progress['dedication'] == 'failed'
+    assert not Internship.objects.get(id=completed_internship.id).report_generated
+
+
+@pytest.mark.django_db
+def test_concurrent_sections_take_roughly_the_slowest_call(settings, completed_internship, gemini):
+    import time
+    from apps.utils.internship_report import InternshipReportBuilder
+
+    def slow_generate(prompt, **kwargs):
+        time.sleep(0.2)
+        return mock.Mock(text="Section text", usage_metadata=None)
+
+    gemini.GenerativeModel.return_value.generate_content.side_effect = slow_generate
+    settings.REPORT_SECTION_CONCURRENCY = len(REPORT_SECTIONS)
+
+    started = time.monotonic()
+    sections = InternshipReportBuilder(completed_internship).generate_sections()
+
+    assert list(sections) == REPORT_SECTIONS
+    assert time.monotonic() - started < 0.2 * len(REPORT_SECTIONS) / 2
+
+
+@pytest.mark.django_db
+def test_concurrent_sections_time_out(settings, completed_internship, gemini):
+    import time
+    from apps.utils.internship_report import InternshipReportBuilder
+
+    def generate(prompt, **kwargs):
+        if 'dedication' in prompt:
+            time.sleep(1.5)
+        return mock.Mock(text="Section text", usage_metadata=None)
+
+    gemini.GenerativeModel.return_value.generate_content.side_effect = generate
+    settings.REPORT_SECTION_CONCURRENCY = len(REPORT_SECTIONS)
+    settings.REPORT_SECTION_TIMEOUT = 1
+    settings.LLM_MAX_RETRIES = 0
+    progress = {}
+
+    builder = InternshipReportBuilder(completed_internship, progress_callback=progress.__setitem__)
+    with pytest.raises(TimeoutError):
+        builder.generate_sections()
+    assert progress['dedication'] == 'failed'
+    assert progress['conclusion'] == 'completed'
+
+
+@pytest.mark.django_db
+def test_retry_reuses_cached_sections(completed_internship, gemini):
+    generate_content = gemini.GenerativeModel.return_value.generate_content
+
+    def fail_conclusion(prompt, **kwargs):
+        if 'conclusion and recommendations' in prompt:
+            raise RuntimeError("upstream error")
+        return mock.Mock(text="Section text", usage_metadata=None)
+
+    generate_content.side_effect = fail_conclusion
+    failed_job = run_report_job(ReportJob.objects.create(internship=completed_internship))
+    assert failed_job.status == 'failed'
+    assert LLMResponseCache.objects.count() == len(REPORT_SECTIONS) - 1
+
+    generate_content.reset_mock(side_effect=True)
+    generate_content.return_value.text = "Conclusion text"
+    job = run_report_job(ReportJob.objects.create(internship=completed_internship))
+
+    assert job.status == 'completed'
+    assert generate_content.call_count == 1
+    assert job.progress['conclusion'] == 'completed'
+    assert job.progress['dedication'] == 'cached'
+
+
+@pytest.mark.django_db
+def test_cache_bypass_regenerates_every_section(completed_internship, gemini):
+    generate_content = gemini.GenerativeModel.return_value.generate_content
+    run_report_job(ReportJob.objects.create(internship=completed_internship))
+    Internship.objects.filter(id=completed_internship.id).update(report_generated=False)
+    generate_content.reset_mock()
+
+    run_report_job(ReportJob.objects.create(internship=completed_internship, use_cache=False))
+
+    assert generate_content.call_count == len(REPORT_SECTIONS)
+
+
+@pytest.mark.django_db
+def test_llm_cache_evicts_least_recently_used():
+    cache_response('a' * 64, 'model', 'dedication', 'x' * 10)
+    cache_response('b' * 64, 'model', 'acknowledgment', 'x' * 10)
+    get_cached_response('a' * 64)
+
+    evicted = evict_cached_responses(max_bytes=15)
+
+    assert evicted == 1
+    assert get_cached_response('a' * 64) == 'x' * 10
+    assert get_cached_response('b' * 64) is None
+
+
+@pytest.mark.django_db
+def test_structured_mode_falls_back_for_missing_sections(settings, completed_internship, gemini):
+    import json
+    from apps.utils.internship_report import InternshipReportBuilder
+
+    settings.REPORT_GENERATION_MODE = 'structured'
+    generate_content = gemini.GenerativeModel.return_value.generate_content
+    structured = {section: f"{section} text" for section in REPORT_SECTIONS if section != 'conclusion'}
+
+    def generate(prompt, **kwargs):
+        if 'generation_config' in kwargs:
+            return mock.Mock(text=json.dumps(structured), usage_metadata=None)
+        return mock.Mock(text="Fallback conclusion", usage_metadata=None)
+
+    generate_content.side_effect = generate
+    sections = InternshipReportBuilder(completed_internship).generate_sections()
+
+    assert generate_content.call_count == 2
+    assert sections['dedication'] == "dedication text"
+    assert sections['conclusion'] == "Fallback conclusion"
+
+
+def test_parse_structured_sections_rejects_invalid_values():
+    from apps.utils.internship_report import parse_structured_sections
+
+    text = '```json\n{"dedication": "To my family", "acknowledgment": "", "conclusion": 42}\n```'
+
+    assert parse_structured_sections(text, REPORT_SECTIONS) == {'dedication': "To my family"}
+    assert parse_structured_sections("not json", REPORT_SECTIONS) == {}
+    assert parse_structured_sections('["a list"]', REPORT_SECTIONS) == {}
+
+
+@pytest.mark.django_db
+def test_long_weeks_are_summarised_once_and_cached(settings, completed_internship, gemini):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from apps.utils.internship_report import InternshipReportBuilder, report_internships
+
+    settings.REPORT_WEEKLY_LOGS_TOKEN_BUDGET = 5  # Forces the 20 character budget below the raw entry
+    generate_content = gemini.GenerativeModel.return_value.generate_content
+    generate_content.return_value.text = "Worked on authentication"
+    internship = report_internships().get(id=completed_internship.id)
+
+    with CaptureQueriesContext(connection) as queries:
+        digest = InternshipReportBuilder(internship).summarise_weekly_logs()
+
+    # Entries come from the prefetch; the only queries left are for the response cache
+    assert all('llmresponsecache' in query['sql'] or 'SAVEPOINT' in query['sql'] for query in queries)
+
+    assert digest == "Week 5: Worked on..."
+    assert generate_content.call_count == 1
+    assert "Built the login API" in generate_content.call_args.args[0]
+
+    InternshipReportBuilder(internship).summarise_weekly_logs()
+    assert generate_content.call_count == 1
+
+
+@pytest.mark.django_db
+def test_short_weeks_are_used_verbatim(completed_internship, gemini):
+    from apps.utils.internship_report import InternshipReportBuilder, report_internships
+
+    internship = report_internships().get(id=completed_internship.id)
+    digest = InternshipReportBuilder(internship).summarise_weekly_logs()
+
+    assert digest.startswith("Week 5: -") and "Built the login API" in digest
+    gemini.GenerativeModel.return_value.generate_content.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_download_template_report_offline(client, completed_internship, gemini):
+    from docx import Document
+
+    response = client.post('/api/auth/login/', {"email": "student@example.com", "password": "password123"})
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    response = client.get(f'/api/internships/{completed_internship.id}/report/')
+
+    assert response.status_code == 200
+    assert response['Content-Disposition'].endswith('.docx"')
+    document = Document(BytesIO(b''.join(response.streaming_content)))
+    text = "\n".join(paragraph.text for paragraph in document.paragraphs)
+    assert "Built the login API" in text
+    assert "Tech Corp" in text
+    gemini.GenerativeModel.assert_not_called()
+
+    response = client.get(f'/api/internships/{completed_internship.id}/report/?source=ai')
+    assert response.status_code == 404
+
+
+def test_fake_llm_client_injects_latency_and_failures():
+    import time
+    from apps.utils.llm import FakeLLMClient, LLMRateLimitError, LLMTimeoutError, LLMTransientError
+
+    client = FakeLLMClient(latency=0.05, words=5)
+    started = time.monotonic()
+    response = client.generate("Write a dedication")
+    assert time.monotonic() - started >= 0.05
+    assert response.text.endswith(".") and response.total_tokens > 0
+
+    with pytest.raises(LLMTimeoutError):
+        FakeLLMClient(latency=0.2).generate("slow", timeout=0.01)
+    with pytest.raises(LLMRateLimitError):
+        FakeLLMClient(rate_limit_rate=1).generate("limited")
+    # Injected 500s are transient, like Gemini's, so they go through retries and the breaker
+    with pytest.raises(LLMTransientError):
+        FakeLLMClient(error_rate=1).generate("broken")
+
+    structured = FakeLLMClient().generate("Respond with keys are exactly: dedication, conclusion.", json_output=True)
+    assert set(json.loads(structured.text)) == {'dedication', 'conclusion'}
+
+
+@pytest.mark.django_db
+def test_report_pipeline_runs_against_fake_backend(settings, completed_internship):
+    from apps.utils.internship_report import InternshipReportBuilder
+
+    settings.LLM_BACKEND = 'fake'
+    settings.REPORT_GENERATION_MODE = 'structured'
+
+    sections = InternshipReportBuilder(completed_internship).generate_sections()
+
+    assert list(sections) == REPORT_SECTIONS
+    assert LLMResponseCache.objects.filter(model_name='fake-gemini-2.0-flash').count() == len(REPORT_SECTIONS)
+
+    output = StringIO()
+    call_command('benchmark_report_pipeline', '--latency', '0', '--jitter', '0', stdout=output)
+    assert 'Reports: 1 (0 failed)' in output.getvalue()
+
+
+def test_resilient_client_retries_transient_errors_then_opens_breaker():
+    from apps.utils.llm import (
+        CircuitBreaker, FakeLLMClient, LLMRateLimitError, LLMUnavailableError, ResilientLLMClient, llm_state
+    )
+
+    flaky = mock.Mock(model_name='flaky')
+    flaky.generate.side_effect = [LLMRateLimitError("429"), LLMRateLimitError("429"), FakeLLMClient().generate("ok")]
+    client = ResilientLLMClient(flaky, CircuitBreaker('test', failure_threshold=3), max_retries=3, base_delay=0)
+    assert client.generate("ok").text
+    assert flaky.generate.call_count == 3
+
+    # Two more failures reach the threshold: the breaker opens and retries stop
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=60)
+    failing = ResilientLLMClient(FakeLLMClient(rate_limit_rate=1), breaker, max_retries=5, base_delay=0)
+    with pytest.raises(LLMRateLimitError):
+        failing.generate("limited")
+    assert breaker.is_open() and breaker.retry_after() > 0
+    with pytest.raises(LLMUnavailableError):
+        failing.generate("limited")
+
+    # After the reset timeout one trial call is let through, and its success closes the breaker
+    llm_state.set(breaker._open_until_key, 0, timeout=None)
+    assert breaker.allow_request() and not breaker.allow_request()
+    breaker.record_success()
+    assert not breaker.is_open() and breaker.allow_request()
+
+
+@pytest.mark.django_db
+def test_breaker_and_rate_limit_state_survive_default_cache_culling(configured_caches):
+    from django.core.cache import cache
+    from apps.utils.llm import CircuitBreaker, RateLimiter, llm_state
+
+    breaker = CircuitBreaker('culled', failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    limiter = RateLimiter('culled', rate=1 / 60, capacity=1)
+    assert limiter.try_acquire() == 0 and limiter.try_acquire() > 0
+
+    # Past MAX_ENTRIES the default cache culls its first keys in order, which `llm-*` keys would be
+    cache.set_many({f"bulk:{i}": i for i in range(400)})
+    assert cache.get("bulk:0") is None
+    assert breaker.is_open()
+    assert limiter.try_acquire() > 0
+
+    # A failure after a concurrent success cleared the count starts a new run
+    llm_state.delete(breaker._failures_key)
+    breaker.record_failure()
+    assert llm_state.get(breaker._failures_key) == 1
+
+
+def test_resilient_client_stops_retrying_at_the_deadline():
+    import time
+    from apps.utils.llm import CircuitBreaker, LLMTimeoutError, ResilientLLMClient
+
+    slow = mock.Mock(model_name='slow')
+    slow.generate.side_effect = LLMTimeoutError("504")
+    client = ResilientLLMClient(
+        slow, CircuitBreaker('deadline', failure_threshold=100), max_retries=20, base_delay=0.1, max_delay=0.1
+    )
+    # Three attempts plus the longest backoff before each retry
+    budgeted = ResilientLLMClient(slow, client.breaker, max_retries=2, base_delay=0.1, max_delay=0.15)
+    assert budgeted.call_budget(timeout=5) == pytest.approx(3 * 5 + 0.1 + 0.15)
+
+    started = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        client.generate("prompt", timeout=5, deadline=started + 0.3)
+
+    assert time.monotonic() - started < 0.5
+    assert slow.generate.call_count < 21
+    # No attempt is given more time than is left before the deadline
+    assert all(call.kwargs['timeout'] <= 0.3 for call in slow.generate.call_args_list)
+
+
+@pytest.mark.django_db
+def test_generate_report_fails_fast_while_breaker_is_open(client, settings, completed_internship, gemini):
+    from apps.utils.llm import CircuitBreaker
+
+    breaker = CircuitBreaker(settings.LLM_BACKEND, failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    response = client.post('/api/auth/login/', {"email": "student@example.com", "password": "password123"})
+    token = response.data['access']
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    response = client.post(f'/api/internships/{completed_internship.id}/generate-report/')
+
+    assert response.status_code == 503
+    assert 0 < int(response['Retry-After']) <= 30
+    assert not ReportJob.objects.exists()
+
+
+def test_rate_limiter_shares_a_token_bucket():
+    from apps.utils.llm import RateLimiter
+
+    limiter = RateLimiter('test', rate=10, capacity=2)
+    assert limiter.try_acquire() == 0
+    # Another worker's limiter draws from the same bucket
+    assert RateLimiter('test', rate=10, capacity=2).try_acquire() == 0
+    assert 0 < limiter.try_acquire() <= 0.1
+
+    started = timezone.now()
+    limiter.acquire()
+    assert (timezone.now() - started).total_seconds() >= 0.05
+    assert RateLimiter('unlimited', rate=0).try_acquire() == 0
+
+
+def test_fair_queue_interleaves_departments_and_students():
+    from apps.utils.internship_report import fair_queue_order
+
+    # Department 1 submitted a burst (student 10 twice) before departments 2 and 3 queued anything
+    jobs = [(1, 1, 10), (2, 1, 10), (3, 1, 11), (4, 1, 12), (5, 2, 20), (6, 3, 30), (7, 2, 21)]
+
+    assert fair_queue_order(jobs) == [1, 5, 6, 3, 7, 4, 2]
+
+
+@pytest.mark.django_db
+def test_report_worker_claims_jobs_fairly(completed_internship, school, student_user):
+    from apps.departments.models import Department
+    from apps.students.models import Student
+    from apps.utils.internship_report import claim_next_report_job
+
+    other_user = User.objects.create_user(
+        email="other@example.com", password="password123",
+        full_name="Other Student", contact="+237623456789", role="student"
+    )
+    other_student = Student.objects.create(
+        user=other_user, matricule_num="UBa25E0002",
+        department=Department.objects.create(name="Mathematics", school=school)
+    )
+    other_internship = Internship.objects.create(
+        student=other_student, company=completed_internship.company, academic_year=completed_internship.academic_year,
+        start_date=completed_internship.start_date, end_date=completed_internship.end_date,
+        job_description="Analyst", supervisor=completed_internship.supervisor
+    )
+
+    first = ReportJob.objects.create(internship=completed_internship, requested_by=student_user.user, kind='week_narrative')
+    ReportJob.objects.create(internship=completed_internship, requested_by=student_user.user, kind='week_narrative')
+    late = ReportJob.objects.create(internship=other_internship, requested_by=other_user)
+
+    assert claim_next_report_job() == first
+    assert claim_next_report_job() == late
+
+
+@pytest.mark.django_db
+def test_llm_calls_are_recorded_per_section(settings, completed_internship, gemini):
+    from apps.internships.models import LLMCallRecord
+    from apps.utils.internship_report import InternshipReportBuilder
+
+    settings.REPORT_SECTION_CONCURRENCY = 1
+    generate_content = gemini.GenerativeModel.return_value.generate_content
+    generate_content.side_effect = [RuntimeError("boom")]
+
+    with pytest.raises(RuntimeError):
+        InternshipReportBuilder(completed_internship).generate_sections()
+    failed = LLMCallRecord.objects.get()
+    assert (failed.section, failed.outcome, failed.error) == ('dedication', 'error', 'boom')
+
+    generate_content.side_effect = None
+    InternshipReportBuilder(completed_internship).generate_sections()
+    record = LLMCallRecord.objects.filter(outcome='success', section='conclusion').get()
+    assert record.internship == completed_internship
+    assert (record.prompt_tokens, record.response_tokens, record.total_tokens) == (200, 50, 250)
+    assert record.prompt_chars > 0 and record.response_chars == len("Generated **section** text")
+
+    output = StringIO()
+    call_command('llm_usage_report', stdout=output)
+    lines = output.getvalue().splitlines()
+    assert lines[0].startswith('Section')
+    assert any(line.startswith('dedication') and line.split()[1:3] == ['2', '1'] for line in lines)
@@ -4,7 +4,7 @@ from apps.internships.views import (
     InternshipDeleteView, InternshipBulkUpdateView,
     InternshipMyListView, OngoingInternshipView, InternshipReportDownloadView
 )
-from apps.utils.internship_report import InternshipReportGenerateView
+from apps.utils.internship_report import InternshipReportGenerateView, InternshipReportJobStatusView
 
 urlpatterns = [
     path('<int:company_id>/list', InternshipListView.as_view(), name='internship-list'),
@@ -16,4 +16,5 @@ urlpatterns = [
     path('<int:company_id>/bulk-update/', InternshipBulkUpdateView.as_view(), name='internship-bulk-update'),
     path('<int:internship_id>/report/', InternshipReportDownloadView.as_view(), name='internship-report'),
     path('<int:internship_id>/generate-report/', InternshipReportGenerateView.as_view(), name='generate-internship-report'),
+    path('<int:internship_id>/report-jobs/<int:job_id>/', InternshipReportJobStatusView.as_view(), name='internship-report-job'),
 ]
\ No newline at end of file
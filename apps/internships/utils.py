@@ -0,0 +1,124 @@
+from io import BytesIO
+
+from django.core.exceptions import ObjectDoesNotExist
+
+from apps.internships.models import Internship
+from apps.utils.internship_report import (
+    InternshipReportBuilder, approved_logbook_entries, ordered_weekly_logs, report_internships
+)
+
+
+def template_report_internships():
+    """Everything the template engine reads, in a fixed number of queries."""
+    return report_internships().select_related('evaluation').prefetch_related(
+        'evaluation__categories__template'
+    )
+
+
+class TemplateReportBuilder(InternshipReportBuilder):
+    """
+    Deterministic, offline report engine. Every section is written from the internship's own
+    records (weeks, approved entries, supervisor comments and the evaluation), then laid out with
+    the same Word template as the AI report. No network access is needed.
+    """
+
+    def generate_sections(self):
+        internship = self.internship
+        student = internship.student.user.full_name
+        company = internship.company.name
+        supervisor = internship.supervisor.user.full_name
+        department = internship.student.department
+        period = f"{internship.start_date.strftime('%B %d, %Y')} to {internship.end_date.strftime('%B %d, %Y')}"
+
+        weeks = [week for week in ordered_weekly_logs(internship) if approved_logbook_entries(week)]
+        entry_count = sum(len(approved_logbook_entries(week)) for week in weeks)
+        evaluation = self._evaluation()
+        activities = "\n".join(self._week_activities(week) for week in weeks)
+
+        summary = (
+            f"This report presents the internship I carried out at {company} from {period} "
+            f"in the role of {internship.job_description}. Over {len(weeks)} weeks I recorded "
+            f"{entry_count} logbook activities approved by my field supervisor, {supervisor}."
+        )
+        if evaluation is not None:
+            summary += f" My field supervisor's evaluation gave an overall score of {evaluation.total_score}/100."
+
+        return {
+            'dedication': (
+                f"I dedicate this report to my family and to everyone at {company} "
+                "who supported me throughout my internship."
+            ),
+            'acknowledgment': (
+                f"I would like to thank {supervisor}, my field supervisor, and the entire team at {company} "
+                f"for their guidance during my internship. I also thank the Department of {department.name} "
+                f"of the {department.school.name} for making this industrial attachment possible."
+            ),
+            'executive_summary': summary,
+            'introduction': "\n".join([
+                "### 1.1 Overview",
+                f"I, {student}, carried out my industrial attachment at {company} from {period}.",
+                "### 1.2 Objectives",
+                f"The objective of the internship was to gain practical experience as {internship.job_description}.",
+                "### 1.3 Company Presentation",
+                f"{company} is located at {internship.company.address} and I was attached to its "
+                f"{internship.company.division} division.",
+            ]),
+            'activities': activities or "No approved logbook activities were recorded.",
+            'technical_details': self._technical_details(weeks),
+            'skills_learned': self._skills_learned(evaluation),
+            'conclusion': "\n".join([
+                "### 5.1 Conclusion",
+                f"My internship at {company} gave me practical experience in {internship.job_description} "
+                f"across {len(weeks)} weeks of recorded work.",
+                "### 5.2 Recommendations",
+                evaluation.comments if evaluation is not None and evaluation.comments else
+                "I recommend that future interns keep their logbook up to date every day and seek regular "
+                "feedback from their supervisors.",
+            ]),
+        }
+
+    def _week_activities(self, week):
+        lines = [f"### Week {week.week_no}"]
+        if week.narrative:
+            lines.append(week.narrative)
+        else:
+            lines.extend(
+                f"On {entry.created_at.strftime('%A %B %d, %Y')}, {entry.description}"
+                for entry in approved_logbook_entries(week)
+            )
+        return "\n".join(lines)
+
+    def _technical_details(self, weeks):
+        lines = [
+            f"The technical work carried out during the internship followed the agreed job description: "
+            f"{self.internship.job_description}."
+        ]
+        for week in weeks:
+            feedback = [entry.feedback for entry in approved_logbook_entries(week) if entry.feedback]
+            if week.comment:
+                feedback.append(week.comment)
+            if feedback:
+                lines.append(f"Supervisor feedback for week {week.week_no}: {' '.join(feedback)}")
+        return "\n".join(lines)
+
+    def _skills_learned(self, evaluation):
+        if evaluation is None:
+            return "The skills developed during the internship are reflected in the activities described in Chapter 2."
+        lines = ["My field supervisor assessed the following areas at the end of the internship:"]
+        for category in sorted(evaluation.categories.all(), key=lambda category: category.template.order):
+            lines.append(f"{category.name.title()}: {category.subfields_total}/20")
+        return "\n".join(lines)
+
+    def _evaluation(self):
+        try:
+            return self.internship.evaluation
+        except ObjectDoesNotExist:
+            return None
+
+
+def generate_internship_report(internship: Internship):
+    document = TemplateReportBuilder(internship).build()
+    buffer = BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
@@ -5,7 +5,8 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.http import FileResponse
 from apps.internships.models import Internship
-from ..utils.internship_report import InternshipReportGenerateView
+from apps.internships.utils import generate_internship_report, template_report_internships
+from apps.utils.file_serving import serve_file
 
 class InternshipListView(APIView):
     permission_classes = [IsAuthenticated]
@@ -175,13 +176,7 @@ class InternshipReportDownloadView(APIView):
 
     def get(self, request, internship_id):
         try:
-            internship = Internship.objects.select_related(
-                'student__user', 'student__department__school',
-                'company', 'supervisor__user',
-                'logbook'
-            ).prefetch_related(
-                'logbook__weekly_logs__logbook_entries'
-            ).get(id=internship_id, student__user=request.user)
+            internship = template_report_internships().get(id=internship_id, student__user=request.user)
         except Internship.DoesNotExist:
             return Response({"error": "Internship not found or unauthorized."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -189,7 +184,13 @@ class InternshipReportDownloadView(APIView):
             return Response({"error": "Internship must be completed before report generation."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        buffer = generate_internship_report(internship)
         filename = f"internship_report_{request.user.full_name.replace(' ', '_')}.docx"
-        return FileResponse(buffer, as_attachment=True, filename=filename)
 
+        # `?source=ai` serves the Gemini report once generate-report/ has produced it
+        if request.query_params.get('source') == 'ai':
+            if not internship.report_file:
+                return Response({"error": "AI report has not been generated yet."}, status=status.HTTP_404_NOT_FOUND)
+            return serve_file(request, internship.report_file.path, filename=filename)
+
+        buffer = generate_internship_report(internship)
+        return FileResponse(buffer, as_attachment=True, filename=filename)
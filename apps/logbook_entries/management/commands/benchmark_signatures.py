@@ -0,0 +1,49 @@
+import time
+
+import ecdsa
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.utils.signatures import SIGNATURE_BACKENDS
+
+
+class Command(BaseCommand):
+    help = 'Compare signing and verification throughput of the signature backends on entry-sized messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500, help='Signatures and verifications per backend')
+        parser.add_argument('--message-size', type=int, default=600, help='Bytes per signed message')
+
+    def handle(self, *args, **options):
+        iterations = max(options['iterations'], 1)
+        key = ecdsa.SigningKey.generate(curve=ecdsa.NIST256p)
+        private_key, public_key = key.to_string(), key.verifying_key.to_string()
+        messages = [(f"{i:06d}" * options['message_size'])[:options['message_size']].encode() for i in range(iterations)]
+
+        signatures = {}
+        self.stdout.write(f"{'Backend':<14}{'Load (ms)':>12}{'Sign/s':>12}{'Verify/s':>12}")
+        for name, backend in SIGNATURE_BACKENDS.items():
+            started = time.perf_counter()
+            signing_key = backend.load_signing_key(private_key)
+            verifying_key = backend.load_verifying_key(public_key)
+            load_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            signatures[name] = [backend.sign(signing_key, message) for message in messages]
+            sign_rate = iterations / (time.perf_counter() - started)
+
+            started = time.perf_counter()
+            valid = sum(backend.verify(verifying_key, signature, message)
+                        for signature, message in zip(signatures[name], messages))
+            verify_rate = iterations / (time.perf_counter() - started)
+            if valid != iterations:
+                raise CommandError(f"{name} rejected {iterations - valid} of its own signatures.")
+            self.stdout.write(f"{name:<14}{load_time * 1000:>12.2f}{sign_rate:>12.0f}{verify_rate:>12.0f}")
+
+        # Every backend must accept what every other one signed
+        for signer, signed in signatures.items():
+            for name, backend in SIGNATURE_BACKENDS.items():
+                verifying_key = backend.load_verifying_key(public_key)
+                if not all(backend.verify(verifying_key, signature, message)
+                           for signature, message in zip(signed[:20], messages)):
+                    raise CommandError(f"{name} cannot verify signatures made by {signer}.")
+        self.stdout.write("All backends verify each other's signatures.")
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 13:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logbook_entries', '0004_alter_logbookentry_options'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='logbookentry',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
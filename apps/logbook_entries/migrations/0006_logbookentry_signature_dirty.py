@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logbook_entries', '0005_logbookentry_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logbookentry',
+            name='signature_dirty',
+            field=models.BooleanField(default=False),
+        ),
+    ]
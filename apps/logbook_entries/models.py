@@ -2,8 +2,8 @@ from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
 from apps.core.models import BaseModel
+from apps.utils.signatures import get_signature_backend
 from apps.weekly_logs.models import WeeklyLog
-import ecdsa  # Modern cryptographic library for digital signatures
 from django.conf import settings
 
 
@@ -18,7 +18,11 @@ class LogbookEntry(BaseModel):
     feedback = models.TextField(max_length=500, blank=True)
     signature = models.TextField(blank=True)       # latest signature
     original_signature = models.TextField(blank=True, null=True)
+    # Edited since it was last signed; with deferred signing the signature is redone on approval
+    signature_dirty = models.BooleanField(default=False)
 
+    # Known before the INSERT (unlike auto_now_add), as the signature covers it
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     weekly_log = models.ForeignKey(WeeklyLog, on_delete=models.CASCADE, related_name='logbook_entries')
 
     objects = LogbookEntryManager()
@@ -29,42 +33,40 @@ class LogbookEntry(BaseModel):
         if self.is_immutable and not self.signature:
             raise ValidationError("A digital signature is required for immutable entries.")
 
-    def generate_signature(self, user_private_key_hex):
+    def signature_message(self):
         # Sign description+feedback+timestamp
-        message = f"{self.description}{self.feedback}{self.created_at.isoformat()}".encode()
-        sk = ecdsa.SigningKey.from_string(bytes.fromhex(user_private_key_hex), curve=ecdsa.NIST256p)
-        signature = sk.sign(message).hex()
-        return signature
+        return f"{self.description}{self.feedback}{self.created_at.isoformat()}".encode()
+
+    def generate_signature(self, signing_key):
+        """Hex signature made with a key loaded by the configured signature backend."""
+        return get_signature_backend().sign(signing_key, self.signature_message()).hex()
+
+    def sign(self):
+        """Sign the current content with the student's key."""
+        student = self.weekly_log.logbook.internship.student
+        self.signature = self.generate_signature(student.get_signing_key())
+        self.signature_dirty = False
 
     def verify_signature(self, signature_hex):
         student = self.weekly_log.logbook.internship.student
-        vk = ecdsa.VerifyingKey.from_string(bytes.fromhex(student.public_key), curve=ecdsa.NIST256p)
-        message = f"{self.description}{self.feedback}{self.created_at.isoformat()}".encode()
         try:
-            return vk.verify(bytes.fromhex(signature_hex), message)
-        except Exception:
+            signature = bytes.fromhex(signature_hex)
+        except ValueError:
             return False
+        return get_signature_backend().verify(student.get_verifying_key(), signature, self.signature_message())
 
     def save(self, *args, **kwargs):
         self.clean()
 
-        # Only generate signature if this is a new instance and not already signed
+        # Only generate signature if this is a new instance and not already signed. created_at is
+        # set when the instance is built, so the entry is signed before its single INSERT
         if not self.pk and hasattr(self.weekly_log.logbook.internship.student, 'encrypted_private_key'):
-            # Save first to get created_at populated
-            super().save(*args, **kwargs)
-
-            student = self.weekly_log.logbook.internship.student
             try:
-                private_key = student.get_private_key()  # implement secure access
-                self.signature = self.generate_signature(private_key)
+                self.sign()
                 self.original_signature = self.signature
             except Exception as e:
                 raise ValidationError(f"Failed to generate signature: {e}")
 
-            # Save again with signature
-            return super().save(update_fields=['signature', 'original_signature'])
-
-        # Regular update (or already has pk)
         return super().save(*args, **kwargs)
 
     def __str__(self):
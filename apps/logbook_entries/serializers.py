@@ -37,13 +37,15 @@ class LogbookEntrySerializer(serializers.ModelSerializer):
             if 'feedback' in validated_data:
                 instance.feedback = validated_data['feedback']
 
-        # Regenerate signature using server-managed key
-        student = instance.weekly_log.logbook.internship.student
-        try:
-            private_key_hex = student.get_private_key()
-            instance.signature = instance.generate_signature(private_key_hex)
-        except Exception as e:
-            raise serializers.ValidationError(f"Failed to regenerate signature: {e}")
+        if settings.LOGBOOK_ENTRY_DEFERRED_SIGNING:
+            # Drafts change often; the entry is signed once, when it is approved
+            instance.signature_dirty = True
+        else:
+            # Regenerate signature using server-managed key
+            try:
+                instance.sign()
+            except Exception as e:
+                raise serializers.ValidationError(f"Failed to regenerate signature: {e}")
 
         instance.save()
         # Append new photos if any
@@ -1,3 +1,143 @@
-from django.test import TestCase
+import ecdsa
+import pytest
+from apps.logbook_entries.models import LogbookEntry
+from apps.students.models import Student
+from apps.utils import signing_keys
 
-# Create your tests here.
+
+@pytest.mark.django_db
+def test_student_keys_are_parsed_once_per_process(completed_internship, mocker):
+    signing_keys.clear_key_cache()
+    week = completed_internship.logbook.weekly_logs.get()
+    load_signing = mocker.spy(ecdsa.SigningKey, 'from_string')
+    load_verifying = mocker.spy(ecdsa.VerifyingKey, 'from_string')
+    # Keys are decrypted by the model's own method, and only when the cache misses
+    decrypt = mocker.spy(Student, 'get_private_key')
+
+    entries = [LogbookEntry.objects.create(weekly_log=week, description=f"Task {i}") for i in range(3)]
+    assert all(entry.verify_signature(entry.signature) for entry in entries)
+    assert not entries[0].verify_signature(entries[1].signature)
+    assert load_signing.call_count == decrypt.call_count == 1
+    assert load_verifying.call_count == 1
+
+    # A replaced key has a new fingerprint, so the cached one is never used for it
+    student = completed_internship.student
+    student.encrypted_private_key = student.public_key = ''
+    student.set_private_key()
+    entry = LogbookEntry.objects.create(weekly_log=week, description="Task with the new key")
+    assert entry.verify_signature(entry.signature)
+    assert not entries[0].verify_signature(entries[0].signature)
+    assert load_signing.call_count == decrypt.call_count == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('signer, verifier', [('ecdsa', 'cryptography'), ('cryptography', 'ecdsa')])
+def test_signature_backends_verify_each_other(completed_internship, settings, signer, verifier):
+    week = completed_internship.logbook.weekly_logs.get()
+    settings.SIGNATURE_BACKEND = signer
+    entry = LogbookEntry.objects.create(weekly_log=week, description="Deployed the staging server")
+
+    settings.SIGNATURE_BACKEND = verifier
+    assert entry.verify_signature(entry.signature)
+    entry.description = "Tampered"
+    assert not entry.verify_signature(entry.signature)
+    assert not entry.verify_signature("00" * 64)
+    assert not entry.verify_signature("not hex")
+
+
+def test_signature_benchmark_runs():
+    from io import StringIO
+    from django.core.management import call_command
+
+    output = StringIO()
+    call_command('benchmark_signatures', '--iterations', '20', stdout=output)
+    assert "All backends verify each other's signatures." in output.getvalue()
+
+
+@pytest.mark.django_db
+def test_entry_is_signed_before_a_single_insert(completed_internship):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    week = completed_internship.logbook.weekly_logs.get()
+    week.logbook.internship.student.get_signing_key()
+    with CaptureQueriesContext(connection) as queries:
+        entry = LogbookEntry.objects.create(weekly_log=week, description="Wrote the migration")
+    writes = [query['sql'] for query in queries if 'logbook_entries_logbookentry' in query['sql']]
+    assert len(writes) == 1 and writes[0].startswith('INSERT')
+
+    entry = LogbookEntry.objects.get(id=entry.id)
+    assert entry.original_signature == entry.signature
+    assert entry.verify_signature(entry.signature)
+
+
+def login(client, email):
+    response = client.post('/api/auth/login/', {"email": email, "password": "password123"})
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('deferred', [False, True])
+def test_edited_entries_are_signed_by_approval(client, completed_internship, settings, mocker, deferred):
+    settings.LOGBOOK_ENTRY_DEFERRED_SIGNING = deferred
+    week = completed_internship.logbook.weekly_logs.get()
+    entry = LogbookEntry.objects.create(weekly_log=week, description="First draft")
+    sign = mocker.spy(LogbookEntry, 'sign')
+
+    login(client, "student@example.com")
+    for description in ("Second draft", "Final version"):
+        response = client.patch(f'/api/logbook-entries/{entry.id}/update/', {"description": description})
+        assert response.status_code == 200
+    login(client, "supervisor@techcorp.com")
+    response = client.patch(f'/api/logbook-entries/{entry.id}/update/', {"feedback": "Good"})
+    assert response.status_code == 200
+
+    entry.refresh_from_db()
+    assert entry.signature_dirty == deferred
+    assert entry.verify_signature(entry.signature) != deferred
+    assert sign.call_count == (0 if deferred else 3)
+
+    response = client.post(f'/api/logbook-entries/{entry.id}/approve/')
+    assert response.status_code == 200
+    entry.refresh_from_db()
+    assert entry.is_immutable and not entry.signature_dirty
+    assert entry.verify_signature(entry.signature)
+    assert entry.original_signature != entry.signature
+    assert sign.call_count == (1 if deferred else 3)
+
+
+@pytest.mark.django_db
+def test_bulk_approval_checks_ownership_once_and_writes_once(client, completed_internship, settings):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    settings.SIGNATURE_BACKEND = 'cryptography'
+    week = completed_internship.logbook.weekly_logs.get()
+    approved_before = LogbookEntry.objects.get(weekly_log=week)
+    good = [LogbookEntry.objects.create(weekly_log=week, description=f"Task {i}") for i in range(3)]
+    tampered = LogbookEntry.objects.create(weekly_log=week, description="Honest work")
+    LogbookEntry.objects.filter(id=tampered.id).update(description="Forged work")
+
+    login(client, "supervisor@techcorp.com")
+    requested = [entry.id for entry in good] + [tampered.id, approved_before.id, 999999]
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post('/api/logbook-entries/approve/', {"entry_ids": requested}, format='json')
+    assert response.status_code == 200
+    assert response.data['approved'] == 3
+    assert [result['status'] for result in response.data['results']] == [
+        'approved', 'approved', 'approved', 'invalid_signature', 'already_approved', 'not_found'
+    ]
+    entry_queries = [query['sql'] for query in queries if 'logbook_entries_logbookentry' in query['sql']]
+    assert [sql.split()[0] for sql in entry_queries] == ['SELECT', 'UPDATE']
+    assert LogbookEntry.objects.filter(is_immutable=True).count() == 4
+
+    # A whole week at once
+    response = client.post('/api/logbook-entries/approve/', {"weekly_log": week.id}, format='json')
+    assert response.data['approved'] == 0
+    assert {result['status'] for result in response.data['results']} == {'already_approved', 'invalid_signature'}
+
+    # Malformed ids are rejected instead of reaching the query
+    for payload in ({"weekly_log": "abc"}, {"weekly_log": True}, {"entry_ids": [True]}):
+        assert client.post('/api/logbook-entries/approve/', payload, format='json').status_code == 400
+    login(client, "student@example.com")
+    assert client.post('/api/logbook-entries/approve/', {"weekly_log": week.id}, format='json').status_code == 403
@@ -1,6 +1,7 @@
 from django.urls import path
 from apps.logbook_entries.views import (LogbookEntryListView, LogbookEntryDetailView, LogbookEntryCreateView,
-                        LogbookEntryUpdateView, LogbookEntryDeleteView, LogbookEntryApproveView)
+                        LogbookEntryUpdateView, LogbookEntryDeleteView, LogbookEntryApproveView,
+                        LogbookEntryBulkApproveView)
 
 urlpatterns = [
     path('<int:entry_id>/', LogbookEntryDetailView.as_view(), name='logbook-entry-detail'),
@@ -9,4 +10,5 @@ urlpatterns = [
     path('<int:entry_id>/update/', LogbookEntryUpdateView.as_view(), name='logbook-entry-update'),
     path('<int:entry_id>/delete/', LogbookEntryDeleteView.as_view(), name='logbook-entry-delete'),
     path('<int:entry_id>/approve/', LogbookEntryApproveView.as_view(), name='logbook-entry-approve'),
+    path('approve/', LogbookEntryBulkApproveView.as_view(), name='logbook-entry-bulk-approve'),
 ]
\ No newline at end of file
@@ -1,3 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -88,9 +92,104 @@ class LogbookEntryApproveView(APIView):
             return Response({"error": "Logbook entry not found."}, status=status.HTTP_404_NOT_FOUND)
         if entry.weekly_log.logbook.internship.supervisor.user != request.user:
             return Response({"error": "You can only approve entries for your internships."}, status=status.HTTP_403_FORBIDDEN)
-        if not entry.signature or not entry.verify_signature(entry.signature):
+        if entry.signature_dirty:
+            # Edited since it was last signed: sign exactly what becomes immutable
+            try:
+                entry.sign()
+            except Exception as e:
+                return Response({"error": f"Failed to sign entry: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        elif not entry.signature or not entry.verify_signature(entry.signature):
             return Response({"error": "Invalid or missing signature."}, status=status.HTTP_400_BAD_REQUEST)
         entry.is_immutable = True
         entry.save()
         serializer = LogbookEntrySerializer(entry)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+def is_entity_id(value):
+    # JSON true/false arrive as bool, which is a subclass of int
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class LogbookEntryBulkApproveView(APIView):
+    """
+    Approve many entries at once, given `entry_ids` or a `weekly_log` id. Ownership is checked in
+    the query that loads the entries, signatures are verified in a thread pool (OpenSSL releases
+    the GIL, so this runs in parallel with the 'cryptography' backend) and the valid entries are
+    written back in one UPDATE, all in one transaction that holds the entries' row locks. Every
+    requested entry gets a result.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.user.role != 'supervisor':
+            return Response({"error": "Only supervisors can approve logbook entries."}, status=status.HTTP_403_FORBIDDEN)
+
+        entry_ids = request.data.get('entry_ids')
+        weekly_log_id = request.data.get('weekly_log')
+        if entry_ids is not None:
+            if not isinstance(entry_ids, list) or not all(is_entity_id(entry_id) for entry_id in entry_ids):
+                return Response({"error": "entry_ids must be a list of entry ids."}, status=status.HTTP_400_BAD_REQUEST)
+        elif weekly_log_id is not None:
+            if isinstance(weekly_log_id, str) and weekly_log_id.isdigit():
+                weekly_log_id = int(weekly_log_id)
+            if not is_entity_id(weekly_log_id):
+                return Response({"error": "weekly_log must be a weekly log id."}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            return Response({"error": "Provide entry_ids or weekly_log."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The rows stay locked from verification to the write, so an edit cannot slip in between and
+        # be frozen unchecked, or be overwritten with the signature of its previous content
+        with transaction.atomic():
+            entries = LogbookEntry.objects.filter(
+                weekly_log__logbook__internship__supervisor__user=request.user
+            ).select_related('weekly_log__logbook__internship__student').select_for_update(of=('self',))
+            if entry_ids is not None:
+                entries = list(entries.filter(id__in=entry_ids))
+            else:
+                entries = list(entries.filter(weekly_log_id=weekly_log_id))
+                if not entries:
+                    return Response({"error": "No entries of yours found for this weekly log."},
+                                    status=status.HTTP_404_NOT_FOUND)
+                entry_ids = [entry.id for entry in entries]
+
+            found = {entry.id: entry for entry in entries}
+            results = {}
+            pending = []
+            for entry in entries:
+                if entry.is_immutable:
+                    results[entry.id] = "already_approved"
+                elif entry.signature_dirty:
+                    # Edited since it was last signed: sign exactly what becomes immutable
+                    try:
+                        entry.sign()
+                    except Exception:
+                        results[entry.id] = "signing_failed"
+                        continue
+                    results[entry.id] = "approved"
+                else:
+                    pending.append(entry)
+
+            if pending:
+                # The verifying threads only use keys already in memory, never the locked rows
+                with ThreadPoolExecutor(max_workers=settings.LOGBOOK_ENTRY_VERIFY_WORKERS) as executor:
+                    verified = executor.map(
+                        lambda entry: bool(entry.signature) and entry.verify_signature(entry.signature), pending
+                    )
+                    for entry, valid in zip(pending, verified):
+                        results[entry.id] = "approved" if valid else "invalid_signature"
+
+            approved = [found[entry_id] for entry_id, result in results.items() if result == "approved"]
+            now = timezone.now()
+            for entry in approved:
+                entry.is_immutable = True
+                entry.updated_at = now
+            LogbookEntry.objects.bulk_update(approved, ['is_immutable', 'signature', 'signature_dirty', 'updated_at'])
+
+        return Response({
+            "approved": len(approved),
+            "results": [
+                {"id": entry_id, "status": results.get(entry_id, "not_found")}
+                for entry_id in dict.fromkeys(entry_ids)
+            ],
+        }, status=status.HTTP_200_OK)
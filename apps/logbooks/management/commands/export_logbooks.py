@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.logbooks.utils import export_logbook_pdfs, exportable_logbooks
+from apps.utils.file_serving import stream_zip
+from apps.utils.render_service import RenderService
+
+
+class Command(BaseCommand):
+    help = 'Export the PDFs of completed logbooks for a company, department or academic year into a ZIP file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the ZIP file to write')
+        parser.add_argument('--company', type=int, help='Company id')
+        parser.add_argument('--department', type=int, help='Department id')
+        parser.add_argument('--academic-year', type=int, help='Academic year id')
+        parser.add_argument('--workers', type=int, help='Render processes (defaults to LOGBOOK_EXPORT_WORKERS)')
+
+    def handle(self, *args, **options):
+        logbooks = list(exportable_logbooks(
+            company=options['company'], department=options['department'], academic_year=options['academic_year']
+        ))
+        if not logbooks:
+            raise CommandError('No completed logbooks match these filters.')
+
+        workers = settings.LOGBOOK_EXPORT_WORKERS if options['workers'] is None else options['workers']
+        # Nothing else renders in this process, so renders simply wait for a free process
+        service = RenderService(workers=workers, queue_depth=max(workers, 1), timeout=None, retry_after=0)
+        started = time.perf_counter()
+        try:
+            with open(options['output'], 'wb') as f:
+                for chunk in stream_zip(export_logbook_pdfs(logbooks, service)):
+                    f.write(chunk)
+        finally:
+            service.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {len(logbooks)} logbooks to {options['output']} in {time.perf_counter() - started:.1f}s"
+        ))
@@ -1,3 +1,294 @@
-from django.test import TestCase
+import os
+import pytest
+from apps.logbook_entries.models import LogbookEntry
 
-# Create your tests here.
+
+def login(client, email="student@example.com"):
+    response = client.post('/api/auth/login/', {"email": email, "password": "password123"})
+    token = response.data['access']
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+@pytest.mark.django_db
+def test_logbook_pdf_is_cached_per_version(client, settings, completed_internship, mocker):
+    from apps.logbooks import utils
+    render = mocker.spy(utils, 'generate_logbook_pdf')
+    login(client)
+
+    response = client.get('/api/logbooks/download/')
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content).startswith(b'%PDF')
+    etag = response['ETag']
+
+    # Same version: served from the cache, or not at all when the client already has it
+    assert client.get('/api/logbooks/download/')['ETag'] == etag
+    response = client.get('/api/logbooks/download/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert render.call_count == 1
+
+    # Editing an entry invalidates the cached file, which is replaced by the new version
+    entry = LogbookEntry.objects.get(weekly_log__logbook__internship=completed_internship)
+    entry.feedback = "Well done"
+    entry.save()
+    response = client.get('/api/logbooks/download/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert render.call_count == 2
+    assert len(os.listdir(os.path.join(settings.MEDIA_ROOT, 'logbooks'))) == 1
+
+
+@pytest.mark.django_db
+def test_logbook_pdf_supports_range_requests(client, completed_internship):
+    login(client)
+    full = b''.join(client.get('/api/logbooks/download/').streaming_content)
+
+    response = client.get('/api/logbooks/download/', HTTP_RANGE='bytes=0-99')
+    assert response.status_code == 206
+    assert response['Content-Range'] == f"bytes 0-99/{len(full)}"
+    assert b''.join(response.streaming_content) == full[:100]
+
+    response = client.get('/api/logbooks/download/', HTTP_RANGE='bytes=-10')
+    assert b''.join(response.streaming_content) == full[-10:]
+
+    response = client.get('/api/logbooks/download/', HTTP_RANGE=f'bytes={len(full)}-')
+    assert response.status_code == 416
+
+
+@pytest.mark.django_db
+def test_logbook_pdf_is_offloaded_to_front_proxy(client, settings, completed_internship):
+    settings.FILE_SERVING_BACKEND = 'nginx'
+    login(client)
+
+    response = client.get('/api/logbooks/download/')
+    assert response.status_code == 200
+    assert response['X-Accel-Redirect'].startswith('/protected-media/logbooks/logbook_')
+    assert response.content == b''
+    assert response['Content-Disposition'].startswith('attachment; filename="logbook_')
+
+    settings.FILE_SERVING_BACKEND = 'sendfile'
+    response = client.get('/api/logbooks/download/')
+    assert response['X-Sendfile'].startswith(settings.MEDIA_ROOT)
+
+
+def test_front_proxy_is_only_given_media_files(settings, tmp_path):
+    from django.http import Http404
+    from django.test import RequestFactory
+    from apps.utils.file_serving import serve_file, serve_media
+
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    os.makedirs(os.path.join(settings.MEDIA_ROOT, 'internship_reports'))
+    os.makedirs(os.path.join(settings.MEDIA_ROOT, 'company_logos'))
+    with open(os.path.join(settings.MEDIA_ROOT, 'internship_reports', 'report.docx'), 'wb') as f:
+        f.write(b'report')
+    with open(os.path.join(settings.MEDIA_ROOT, 'company_logos', 'logo.png'), 'wb') as f:
+        f.write(b'logo')
+    outside = tmp_path / 'secret.txt'
+    outside.write_bytes(b'secret')
+    request = RequestFactory().get('/')
+
+    for backend in ('nginx', 'sendfile'):
+        settings.FILE_SERVING_BACKEND = backend
+        response = serve_file(request, str(outside))
+        assert 'X-Accel-Redirect' not in response and 'X-Sendfile' not in response
+        assert b''.join(response.streaming_content) == b'secret'
+
+    settings.DEBUG = False
+    assert serve_media(request, 'company_logos/logo.png')['X-Sendfile'].endswith('logo.png')
+    with pytest.raises(Http404):
+        serve_media(request, 'internship_reports/report.docx')
+
+
+@pytest.mark.django_db
+def test_logbook_pdf_download_backs_off_when_rendering_is_saturated(client, completed_internship, mocker):
+    from apps.logbooks import utils
+    from apps.utils.render_service import RenderService
+
+    full = RenderService(workers=0, queue_depth=0, timeout=30, retry_after=7)
+    mocker.patch('apps.logbooks.views.get_render_service', return_value=full)
+    login(client)
+
+    response = client.get('/api/logbooks/download/')
+    assert response.status_code == 503
+    assert response['Retry-After'] == '7'
+
+    # A version that is already rendered needs no render slot
+    utils.render_cached_logbook_pdf(completed_internship.logbook.id)
+    assert client.get('/api/logbooks/download/').status_code == 200
+
+
+def test_render_service_bounds_queue_and_times_out():
+    import time
+    from apps.utils.render_service import RenderService, RenderServiceBusy, RenderTimeout
+
+    service = RenderService(workers=1, queue_depth=1, timeout=0.5, retry_after=3)
+    try:
+        with pytest.raises(RenderTimeout) as timeout:
+            service.render(time.sleep, 2)
+        assert timeout.value.retry_after == 3
+        # The timed-out render still runs in its process and holds the only slot
+        with pytest.raises(RenderServiceBusy):
+            service.render(time.sleep, 0)
+    finally:
+        service.shutdown()
+
+
+def test_render_service_maps_renders_in_order_within_its_slots():
+    import time
+    from apps.utils.render_service import RenderService, RenderServiceBusy, RenderTimeout
+
+    service = RenderService(workers=2, queue_depth=1, timeout=5, retry_after=3)
+    try:
+        results = service.map(time.sleep, [(0.2,), (0,), (0.1,)])
+        # The export holds the pool's slots, so a download arriving now is refused at once
+        with pytest.raises(RenderServiceBusy):
+            service.render(time.sleep, 0)
+        assert list(results) == [None, None, None]
+    finally:
+        service.shutdown()
+
+    full = RenderService(workers=0, queue_depth=0, timeout=5, retry_after=3)
+    with pytest.raises(RenderServiceBusy):
+        full.map(time.sleep, [(0,)])
+
+    # Once the stream has started, later renders wait for a slot rather than fail the response
+    waiting = RenderService(workers=2, queue_depth=1, timeout=0.3, retry_after=3)
+    try:
+        assert list(waiting.map(time.sleep, [(0.5,), (0,)])) == [None, None]
+    finally:
+        waiting.shutdown()
+
+    # A hung render ends the stream after `timeout` instead of stalling it
+    hung = RenderService(workers=1, queue_depth=1, timeout=0.5, retry_after=3)
+    try:
+        with pytest.raises(RenderTimeout):
+            list(hung.map(time.sleep, [(2,)]))
+    finally:
+        hung.shutdown()
+
+
+def test_streamed_zip_records_why_it_ends_early(tmp_path):
+    import io
+    import zipfile
+    from apps.utils.file_serving import stream_zip
+    from apps.utils.render_service import RenderTimeout
+
+    (tmp_path / 'first.pdf').write_bytes(b'%PDF')
+
+    def files():
+        yield 'first.pdf', tmp_path / 'first.pdf'
+        raise RenderTimeout("Generating the document is taking longer than expected.", 10)
+
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(stream_zip(files(), errors=(RenderTimeout,)))))
+    assert archive.namelist() == ['first.pdf', 'EXPORT_INCOMPLETE.txt']
+    assert b'taking longer' in archive.read('EXPORT_INCOMPLETE.txt')
+
+
+@pytest.mark.django_db
+def test_bulk_export_streams_a_zip_of_logbooks(client, settings, tmp_path, completed_internship, company_admin_user):
+    import io
+    import zipfile
+    from django.core.management import call_command
+
+    settings.LOGBOOK_EXPORT_WORKERS = 0
+    login(client)
+    assert client.get('/api/logbooks/export/').status_code == 403
+
+    login(client, "admin@techcorp.com")
+    assert client.get('/api/logbooks/export/?academic_year=abc').status_code == 400
+    response = client.get('/api/logbooks/export/')
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+    assert archive.namelist() == ['UBa25E0001_Student_User.pdf']
+    assert archive.read('UBa25E0001_Student_User.pdf').startswith(b'%PDF')
+
+    output = tmp_path / 'export.zip'
+    call_command('export_logbooks', str(output), '--company', str(completed_internship.company_id), stdout=io.StringIO())
+    assert zipfile.ZipFile(output).namelist() == ['UBa25E0001_Student_User.pdf']
+
+
+@pytest.mark.django_db
+def test_approved_weeks_are_laid_out_once(client, completed_internship, mocker):
+    from apps.logbooks import utils
+    from apps.weekly_logs.models import WeeklyLog
+
+    week = WeeklyLog.objects.get(logbook__internship=completed_internship)
+    login(client, "supervisor@techcorp.com")
+    response = client.patch(f'/api/weekly-logs/{week.id}/{week.logbook_id}/update/', {"status": "approved"},
+                            format='json')
+    assert response.status_code == 200
+
+    layout = mocker.spy(utils, 'week_flowables')
+    logbook = utils.logbook_pdf_queryset().get(internship=completed_internship)
+    assert utils.generate_logbook_pdf(logbook).getvalue().startswith(b'%PDF')
+    assert utils.generate_logbook_pdf(logbook).getvalue().startswith(b'%PDF')
+    assert layout.call_count == 1
+    # Styles are built once per process and shared by every render
+    assert utils.logbook_styles() is utils.logbook_styles()
+
+    # Changing an entry of the week lays it out again, once
+    entry = LogbookEntry.objects.get(weekly_log=week)
+    entry.feedback = "Well done"
+    entry.save()
+    utils.generate_logbook_pdf(logbook)
+    utils.generate_logbook_pdf(logbook)
+    assert layout.call_count == 2
+
+
+@pytest.mark.django_db
+def test_week_fragments_stay_out_of_the_default_cache(completed_internship, configured_caches, settings, tmp_path):
+    from django.core.cache import cache
+    from django.db import connection
+    from apps.logbooks import utils
+    from apps.utils.llm import CircuitBreaker
+    from apps.weekly_logs.models import WeeklyLog
+
+    settings.CACHES = {**settings.CACHES, 'logbook_fragments': {
+        **settings.CACHES['logbook_fragments'], 'LOCATION': str(tmp_path / 'fragments'),
+    }}
+    breaker = CircuitBreaker('fragments', failure_threshold=1)
+    breaker.record_failure()
+    WeeklyLog.objects.filter(logbook__internship=completed_internship).update(status='approved')
+    logbook = utils.logbook_pdf_queryset().get(internship=completed_internship)
+    week = logbook.weekly_logs.get()
+
+    assert utils.generate_logbook_pdf(logbook).getvalue().startswith(b'%PDF')
+    entry = week.logbook_entries.get()
+    key = utils.week_fragment_key(week, 1, entry.updated_at)
+    assert utils.fragment_cache.get(key) is not None
+    assert cache.get(key) is None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM cache_table")
+        assert cursor.fetchone()[0] == 0
+    assert breaker.is_open()
+
+
+@pytest.mark.django_db
+def test_logbook_pdf_is_laid_out_as_the_build_reaches_each_week(completed_internship, settings, monkeypatch):
+    from reportlab import rl_config
+    from apps.logbooks import utils
+    from apps.weekly_logs.models import WeeklyLog
+
+    weeks = WeeklyLog.objects.bulk_create(
+        WeeklyLog(logbook=completed_internship.logbook, week_no=week_no) for week_no in range(10, 40)
+    )
+    LogbookEntry.objects.bulk_create(
+        LogbookEntry(weekly_log=week, description="Reviewed pull requests and fixed bugs. " * 20) for week in weeks
+    )
+    logbook = utils.logbook_pdf_queryset().get(internship=completed_internship)
+    monkeypatch.setattr(rl_config, 'invariant', 1)
+
+    streamed = utils.generate_logbook_pdf(logbook).getvalue()
+    monkeypatch.setattr(utils, 'FlowableFeed', list)
+    assert utils.generate_logbook_pdf(logbook).getvalue() == streamed
+
+    # The cached render spills to disk past the spool size and is copied over unchanged
+    monkeypatch.undo()
+    monkeypatch.setattr(rl_config, 'invariant', 1)
+    settings.LOGBOOK_RENDER_SPOOL_SIZE = 1024
+    with open(utils.render_cached_logbook_pdf(logbook.id), 'rb') as f:
+        assert f.read() == streamed
+
+    # Rendering in this process is bounded too, by page count
+    settings.LOGBOOK_RENDER_MAX_PAGES = 2
+    with pytest.raises(MemoryError):
+        utils.generate_logbook_pdf(logbook)
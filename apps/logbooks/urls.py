@@ -3,7 +3,7 @@ from apps.logbooks.views import (
     LogbookListView, LogbookDetailView,
     LogbookCreateView, LogbookUpdateView,
     LogbookDeleteView, OngoingLogbookByInternshipView,
-    LogbookPDFDownloadView
+    LogbookPDFDownloadView, LogbookBulkExportView
 )
 
 urlpatterns = [
@@ -14,4 +14,5 @@ urlpatterns = [
     path('<int:internship_id>/ongoing/', OngoingLogbookByInternshipView.as_view(), name='student-ongoing-logbook'),
     path('<int:logbook_id>/delete/', LogbookDeleteView.as_view(), name='logbook-delete'),
     path('download/', LogbookPDFDownloadView.as_view(), name='download_logbook_pdf'),
+    path('export/', LogbookBulkExportView.as_view(), name='export-logbooks'),
 ]
@@ -1,18 +1,72 @@
+from functools import lru_cache
 from io import BytesIO
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
+from itertools import chain
+import re
+from tempfile import SpooledTemporaryFile
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.utils.connection import ConnectionProxy
 from apps.logbooks.models import Logbook
-from datetime import datetime
+from apps.logbook_entries.models import LogbookEntry
+from apps.utils import render_workers
+from apps.utils.media_cache import cached_media_file, content_version
+from datetime import datetime, date
 
-def generate_logbook_pdf(logbook: Logbook):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=0.75*inch, rightMargin=0.75*inch, topMargin=0.75*inch, bottomMargin=0.75*inch)
-    elements = []
-    styles = getSampleStyleSheet()
 
+def logbook_pdf_version(logbook: Logbook):
+    """
+    Version of the rendered logbook PDF. It changes whenever the logbook, one of its weeks or
+    entries, or the people and company printed in the header change, and every day, since the
+    signature block is dated.
+    """
+    internship = logbook.internship
+    weeks = logbook.weekly_logs.aggregate(count=Count('id'), last_updated=Max('updated_at'))
+    entries = LogbookEntry.objects.filter(weekly_log__logbook=logbook).aggregate(
+        count=Count('id'), last_updated=Max('updated_at')
+    )
+    return content_version(
+        logbook.id, logbook.updated_at, internship.updated_at,
+        internship.student.updated_at, internship.student.user.updated_at,
+        internship.company.updated_at, internship.supervisor.user.updated_at,
+        weeks['count'], weeks['last_updated'], entries['count'], entries['last_updated'],
+        date.today(),
+    )
+
+
+LOGBOOK_LAYOUT_VERSION = 1  # Bump when the week layout below changes, to drop cached fragments
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+
+
+class PrewrappedParagraph(Paragraph):
+    """
+    Paragraph that remembers its line breaks for the last width it was wrapped at. Breaking lines
+    is most of the cost of laying out the logbook tables, and a table wraps each cell several
+    times; once pickled with its breaks, a cached week needs no line breaking at all.
+    """
+
+    def wrap(self, availWidth, availHeight):
+        memo = getattr(self, '_wrap_memo', None)
+        if memo is not None and memo[0] == availWidth:
+            _, self.width, self.height, self.blPara = memo
+            return self.width, self.height
+        width, height = super().wrap(availWidth, availHeight)
+        self._wrap_memo = (availWidth, width, height, self.blPara)
+        return width, height
+
+
+@lru_cache(maxsize=1)
+def logbook_styles():
+    """
+    The stylesheet and table cell style, built once per process. Renders only read them, so every
+    render shares the same objects and callers must not change them.
+    """
+    styles = getSampleStyleSheet()
     # Custom style for wrapping text in table cells
     cell_style = ParagraphStyle(
         name='CellStyle',
@@ -22,6 +76,141 @@ def generate_logbook_pdf(logbook: Logbook):
         wordWrap='CJK',  # Enables text wrapping
         leading=10,
     )
+    return styles, cell_style
+
+
+def week_flowables(week, entries, styles, cell_style):
+    elements = []
+    week_title = Paragraph(f"Week {week.week_no}", styles['Heading3'])
+    elements.append(week_title)
+    elements.append(Spacer(1, 8))
+
+    # Table headers for the week
+    week_table_data = [["Day", "Activity Description"]]
+
+    # Initialize dictionary for weekday ordering
+    week_log_dict = {day: "No activity recorded" for day in WEEKDAYS}
+
+    # Populate dictionary with entries
+    for entry in entries:
+        day_name = entry.created_at.strftime("%A")
+        if day_name in week_log_dict:
+            week_log_dict[day_name] = entry.description
+
+    # Create table rows with wrapped text
+    for day in WEEKDAYS:
+        description = PrewrappedParagraph(week_log_dict[day], cell_style)
+        week_table_data.append([day, description])
+
+    week_table = Table(week_table_data, colWidths=[100, 400])
+    week_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 6),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ]))
+    elements.append(week_table)
+    elements.append(Spacer(1, 20))
+    return elements
+
+
+# Laid-out approved weeks, kept apart from the default cache so that cohorts of them never push other keys out
+fragment_cache = ConnectionProxy(caches, 'logbook_fragments')
+
+
+def week_fragment_key(week, entry_count, entries_updated):
+    return "logbook-week:{}:{}".format(week.id, content_version(
+        LOGBOOK_LAYOUT_VERSION, week.updated_at, entry_count, entries_updated
+    ))
+
+
+def cache_week_fragment(week, entry_count=None, entries_updated=None, styles=None):
+    """
+    Lay out an approved week's table once and keep it, line breaks included, in the fragment cache,
+    where every render process finds it. Returns the flowables; the cache hands out a fresh copy
+    on every read, as a build mutates them.
+    """
+    entries = list(week.logbook_entries.order_by('created_at'))
+    if entry_count is None:
+        entry_count = len(entries)
+        entries_updated = max((entry.updated_at for entry in entries), default=None)
+    styles, cell_style = styles or logbook_styles()
+    elements = week_flowables(week, entries, styles, cell_style)
+    for flowable in elements:
+        # The table's column widths are fixed, so this wraps every cell at the width it is drawn at
+        flowable.wrap(A4[0], A4[1])
+    fragment_cache.set(week_fragment_key(week, entry_count, entries_updated), elements,
+                       timeout=settings.LOGBOOK_WEEK_FRAGMENT_TTL)
+    return elements
+
+
+def logbook_week_flowables(logbook, styles, cell_style):
+    """
+    Flowables of every week, in order, produced one week at a time. Approved weeks are frozen, so
+    they come from the fragment cache: the first render after a week is approved lays it out, and
+    later ones only lay out weeks that changed since.
+    """
+    weeks = list(logbook.weekly_logs.order_by('week_no'))
+    entry_stats = {
+        row['weekly_log']: (row['count'], row['last_updated'])
+        for row in LogbookEntry.objects.filter(weekly_log__logbook=logbook).values('weekly_log').annotate(
+            count=Count('id'), last_updated=Max('updated_at')
+        )
+    }
+    for week in weeks:
+        if week.status != 'approved':
+            yield from week_flowables(week, week.logbook_entries.order_by('created_at'), styles, cell_style)
+            continue
+        entry_count, entries_updated = entry_stats.get(week.id, (0, None))
+        fragment = fragment_cache.get(week_fragment_key(week, entry_count, entries_updated))
+        if fragment is None:
+            fragment = cache_week_fragment(week, entry_count, entries_updated, (styles, cell_style))
+        yield from fragment
+
+
+class FlowableFeed(list):
+    """
+    Flowable list for `build()` that is filled from an iterator as the document consumes it.
+    `build()` draws from the front and deletes what it has placed, so only `lookahead` flowables,
+    rather than every week of the logbook, are held at once.
+    """
+
+    def __init__(self, flowables, lookahead=16):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
+
+    def __len__(self):
+        while super().__len__() < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                break
+        return super().__len__()
+
+
+def _check_page_limit(canvas, doc):
+    # ReportLab holds every page until the document is saved, so the page count bounds a render's
+    # memory wherever it runs, including in the web process when RENDER_WORKERS is 0
+    if settings.LOGBOOK_RENDER_MAX_PAGES and doc.page > settings.LOGBOOK_RENDER_MAX_PAGES:
+        raise MemoryError(f"Logbook exceeds {settings.LOGBOOK_RENDER_MAX_PAGES} pages")
+
+
+def generate_logbook_pdf(logbook: Logbook, output=None):
+    """
+    Render the logbook into `output` (a new BytesIO by default) and return it. Weeks are laid out
+    as the pages reach them, so memory does not grow with the number of weeks. Past
+    `LOGBOOK_RENDER_MAX_PAGES` pages the render fails with MemoryError.
+    """
+    buffer = output if output is not None else BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=0.75*inch, rightMargin=0.75*inch, topMargin=0.75*inch, bottomMargin=0.75*inch)
+    styles, cell_style = logbook_styles()
 
     internship = logbook.internship
     student = internship.student
@@ -30,8 +219,7 @@ def generate_logbook_pdf(logbook: Logbook):
     supervisor = internship.supervisor
 
     # ----------- HEADER SECTION -----------
-    elements.append(Paragraph("STUDENT INTERNSHIP LOG BOOK", styles['Heading1']))
-    elements.append(Spacer(1, 12))
+    header_elements = [Paragraph("STUDENT INTERNSHIP LOG BOOK", styles['Heading1']), Spacer(1, 12)]
 
     header_data = [
         ["NAME:", user.full_name],
@@ -50,52 +238,14 @@ def generate_logbook_pdf(logbook: Logbook):
         ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
     ]))
-    elements.append(header_table)
-    elements.append(Spacer(1, 20))
+    header_elements += [header_table, Spacer(1, 20)]
 
     # ----------- DAILY ATTACHMENT RECORDS SECTION -----------
-    elements.append(Paragraph("DAILY ATTACHMENT RECORDS", styles['Heading2']))
-    elements.append(Spacer(1, 12))
+    header_elements += [Paragraph("DAILY ATTACHMENT RECORDS", styles['Heading2']), Spacer(1, 12)]
 
     # ----------- WEEKLY LOGS SECTION -----------
-    for week in logbook.weekly_logs.all().order_by('week_no'):
-        week_title = Paragraph(f"Week {week.week_no}", styles['Heading3'])
-        elements.append(week_title)
-        elements.append(Spacer(1, 8))
-
-        # Table headers for the week
-        week_table_data = [["Day", "Activity Description"]]
-
-        # Initialize dictionary for weekday ordering
-        weekdays = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-        week_log_dict = {day: "No activity recorded" for day in weekdays}
-
-        # Populate dictionary with entries
-        for entry in week.logbook_entries.all():
-            day_name = entry.created_at.strftime("%A")
-            if day_name in week_log_dict:
-                week_log_dict[day_name] = entry.description
-
-        # Create table rows with wrapped text
-        for day in weekdays:
-            description = Paragraph(week_log_dict[day], cell_style)
-            week_table_data.append([day, description])
-
-        week_table = Table(week_table_data, colWidths=[100, 400])
-        week_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 6),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        elements.append(week_table)
-        elements.append(Spacer(1, 20))
+    # Laid out week by week as the build reaches them
+    week_elements = logbook_week_flowables(logbook, styles, cell_style)
 
     # ----------- SIGNATURE SECTION -----------
     signature_text = f"""
@@ -105,10 +255,55 @@ def generate_logbook_pdf(logbook: Logbook):
     Company's Stamp: ____________________________<br/><br/>
     Date: {datetime.today().strftime('%d %B, %Y')}
     """
-    elements.append(Paragraph(signature_text, styles['Normal']))
-    elements.append(Spacer(1, 20))
+    signature_elements = [Paragraph(signature_text, styles['Normal']), Spacer(1, 20)]
 
     # Build PDF
-    doc.build(elements)
+    doc.build(FlowableFeed(chain(header_elements, week_elements, signature_elements)),
+              onLaterPages=_check_page_limit)
     buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer
+
+
+def logbook_pdf_queryset():
+    return Logbook.objects.select_related(
+        'internship__student__user', 'internship__student__department',
+        'internship__company', 'internship__supervisor__user'
+    )
+
+
+def render_cached_logbook_pdf(logbook_id):
+    """Path of the current cached PDF of a logbook, rendering it first if needed."""
+    logbook = logbook_pdf_queryset().get(id=logbook_id)
+    # Large logbooks spill from memory to a temporary file instead of growing the worker
+    output = lambda: SpooledTemporaryFile(max_size=settings.LOGBOOK_RENDER_SPOOL_SIZE)
+    return cached_media_file('logbooks', f"logbook_{logbook.internship_id}", logbook_pdf_version(logbook),
+                             lambda: generate_logbook_pdf(logbook, output()))
+
+
+def exportable_logbooks(company=None, department=None, academic_year=None):
+    """Logbooks of completed internships, optionally narrowed to a company, department and/or academic year."""
+    logbooks = logbook_pdf_queryset().filter(internship__status='completed')
+    if company:
+        logbooks = logbooks.filter(internship__company_id=company)
+    if department:
+        logbooks = logbooks.filter(internship__student__department_id=department)
+    if academic_year:
+        logbooks = logbooks.filter(internship__academic_year_id=academic_year)
+    return logbooks.order_by('internship__student__matricule_num')
+
+
+def logbook_export_name(logbook):
+    student = logbook.internship.student
+    return re.sub(r'[^\w.-]+', '_', f"{student.matricule_num}_{student.user.full_name}") + ".pdf"
+
+
+def export_logbook_pdfs(logbooks, render_service):
+    """
+    Iterate over `(archive name, path)` for each logbook's PDF, in order. Renders go through
+    `render_service`, so an export shares its bounded pool of warm processes (and its slots) with
+    every other render instead of starting processes of its own. Only file paths come back, and
+    logbooks rendered before (and unchanged since) are served from the cache.
+    """
+    names = {logbook.id: logbook_export_name(logbook) for logbook in logbooks}
+    paths = render_service.map(render_workers.render_logbook_pdf, [(logbook_id,) for logbook_id in names])
+    return zip(names.values(), paths)
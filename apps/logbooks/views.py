@@ -7,14 +7,20 @@ from apps.logbooks.serializers import LogbookSerializer
 from apps.internships.models import Internship
 
 import os
-from django.conf import settings
 from rest_framework.views import APIView
-from django.http import FileResponse
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import quote_etag
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from io import BytesIO
 from datetime import datetime
-from apps.logbooks.utils import generate_logbook_pdf
+from apps.logbooks.utils import (
+    export_logbook_pdfs, exportable_logbooks, logbook_pdf_queryset, logbook_pdf_version
+)
+from apps.utils.file_serving import not_modified, serve_file, stream_zip
+from apps.utils import render_workers
+from apps.utils.media_cache import media_path
+from apps.utils.render_service import RenderUnavailable, get_render_service
 
 
 class LogbookListView(APIView):
@@ -144,24 +150,68 @@ class LogbookPDFDownloadView(APIView):
             return Response({"error": "Completed internship not found."}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            logbook = Logbook.objects.prefetch_related('weekly_logs__logbook_entries').get(internship=internship)
+            logbook = logbook_pdf_queryset().get(internship=internship)
         except Logbook.DoesNotExist:
             return Response({"error": "Logbook not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        # Generate PDF
-        pdf_buffer = generate_logbook_pdf(logbook)
-
-        # Ensure media/logbooks directory exists
-        logbook_dir = os.path.join(settings.MEDIA_ROOT, 'logbooks')
-        os.makedirs(logbook_dir, exist_ok=True)
+        # Serve the cached render for this version of the logbook, rendering it only when missing
+        version = logbook_pdf_version(logbook)
+        etag = quote_etag(version)
+        if not_modified(request, etag):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+        else:
+            file_path = media_path('logbooks', f"logbook_{internship.id}", version)
+            if not os.path.exists(file_path):
+                try:
+                    file_path = get_render_service().render(render_workers.render_logbook_pdf, logbook.id)
+                except RenderUnavailable as e:
+                    response = Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                    response['Retry-After'] = str(e.retry_after)
+                    return response
+            filename = f"logbook_{internship.id}_{datetime.now().strftime('%Y%m%d')}.pdf"
+            response = serve_file(request, file_path, filename=filename, etag=etag)
+        # Browsers may keep the file but must revalidate it on every download
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class LogbookBulkExportView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        # Define file path
-        filename = f"logbook_{internship.id}_{datetime.now().strftime('%Y%m%d')}.pdf"
-        file_path = os.path.join(logbook_dir, filename)
+    def get(self, request):
+        user = request.user
+        filters = {}
+        for name in ('company', 'department', 'academic_year'):
+            value = request.query_params.get(name)
+            if value:
+                try:
+                    filters[name] = int(value)
+                except ValueError:
+                    return Response({"error": f"{name} must be an integer id."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Lecturers export their own department and company admins their own company
+        if user.role == 'lecturer':
+            filters['department'] = user.lecturer.department_id
+        elif user.role == 'company_admin':
+            filters['company'] = user.company_admin.company_id
+        elif user.role != 'super_admin':
+            return Response({"error": "Only lecturers, company admins and super admins can export logbooks."},
+                            status=status.HTTP_403_FORBIDDEN)
 
-        # Save PDF to file
-        with open(file_path, 'wb') as f:
-            f.write(pdf_buffer.getvalue())
+        logbooks = list(exportable_logbooks(**filters))
+        if not logbooks:
+            return Response({"error": "No completed logbooks match these filters."}, status=status.HTTP_404_NOT_FOUND)
 
-        # Serve the file
-        return FileResponse(open(file_path, 'rb'), as_attachment=True, filename=filename)
\ No newline at end of file
+        # Renders share the process's bounded render pool with downloads; the archive is streamed as
+        # each logbook is ready, so memory stays flat. A render failing after the first ends the
+        # archive with a note saying so
+        try:
+            files = export_logbook_pdfs(logbooks, get_render_service())
+        except RenderUnavailable as e:
+            response = Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = str(e.retry_after)
+            return response
+        response = StreamingHttpResponse(stream_zip(files, errors=(RenderUnavailable,)), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="logbooks_{datetime.now().strftime("%Y%m%d")}.zip"'
+        return response
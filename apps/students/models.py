@@ -2,6 +2,7 @@ from django.db import models
 from apps.core.models import BaseModel
 from apps.departments.models import Department
 from apps.users.models import User
+from apps.utils.signing_keys import forget_student_keys, signing_key, verifying_key
 from apps.utils.validations import validate_matricule_num
 
 import os, base64, ecdsa
@@ -55,6 +56,7 @@ class Student(BaseModel):
 
         # Save model
         self.save()
+        forget_student_keys(self.id)
 
     def get_private_key(self):
         """
@@ -66,3 +68,10 @@ class Student(BaseModel):
         fernet = Fernet(fernet_key)
         decrypted = fernet.decrypt(self.encrypted_private_key.encode())
         return decrypted.decode()
+
+    def get_signing_key(self):
+        """Private key loaded by the signature backend, cached per process so it is not decrypted on every write."""
+        return signing_key(self)
+
+    def get_verifying_key(self):
+        return verifying_key(self)
@@ -91,8 +91,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         if user.role == 'student':
             student = user.student
             try:
-                # Decrypt using server-held key; no password needed
-                decrypted_key = student.get_private_key()
+                # Decrypt using server-held key; no password needed. This also warms the key cache
+                student.get_signing_key()
             except Exception as e:
                 raise serializers.ValidationError("Failed to decrypt private key.") from e
         return data
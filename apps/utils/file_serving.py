@@ -0,0 +1,178 @@
+import mimetypes
+import os
+import re
+import zipfile
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import content_disposition_header, parse_etags
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def not_modified(request, etag):
+    """True when the client's If-None-Match already covers `etag` (a quoted ETag)."""
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    return etag in if_none_match or '*' in if_none_match
+
+
+def serve_file(request, path, filename=None, as_attachment=True, content_type=None, etag=None):
+    """
+    Respond with the file at `path`. With `FILE_SERVING_BACKEND` set to 'nginx' or 'sendfile'
+    the response is empty and carries an X-Accel-Redirect or X-Sendfile header, so the front
+    proxy sends the bytes. Otherwise the file is streamed from here with single-range support,
+    so interrupted downloads can resume.
+    """
+    if etag and not_modified(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    filename = filename or os.path.basename(path)
+    backend = settings.FILE_SERVING_BACKEND
+
+    relative_path = os.path.relpath(path, settings.MEDIA_ROOT)
+    # Only files under MEDIA_ROOT are handed to the proxy; anything else is streamed from here
+    in_media_root = relative_path != os.pardir and not relative_path.startswith(os.pardir + os.sep)
+    if backend == 'nginx' and in_media_root:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.FILE_SERVING_INTERNAL_URL + quote(relative_path.replace(os.sep, '/'))
+    elif backend == 'sendfile' and in_media_root:
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = os.path.abspath(path)
+    else:
+        response = _stream_file(request, path, content_type, etag)
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    if etag:
+        response['ETag'] = etag
+    return response
+
+
+def _stream_file(request, path, content_type, etag):
+    size = os.path.getsize(path)
+    byte_range = request.headers.get('Range')
+    # A resumed download must not be stitched onto a different version of the file
+    if_range = request.headers.get('If-Range')
+    if byte_range and (if_range is None or if_range == etag):
+        byte_range = parse_byte_range(byte_range, size)
+    else:
+        byte_range = None
+
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        # FileResponse hands the open file to the server's wsgi.file_wrapper and closes it afterwards
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(path, start, end - start + 1), status=206,
+                                         content_type=content_type)
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def parse_byte_range(header, size):
+    """
+    `(start, end)` for a single `bytes=` range, 'unsatisfiable' when it lies beyond the file,
+    or None for anything else (multiple or malformed ranges), which is answered with the whole file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            return 'unsatisfiable'
+        start, end = max(0, size - int(last)), size - 1
+    if start >= size:
+        return 'unsatisfiable'
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+class _ZipSink:
+    """Write-only, unseekable file object that collects what ZipFile writes until it is drained."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(files, errors=(), error_name='EXPORT_INCOMPLETE.txt'):
+    """
+    Build a ZIP of `(archive name, path)` pairs and yield it piece by piece as each file is added,
+    so a response can start before the last file exists and never holds more than one member.
+    Once the response has started it can no longer fail, so an exception of one of the `errors`
+    types ends the archive early with an `error_name` member explaining why, instead of leaving the
+    client a truncated file.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        try:
+            for name, path in files:
+                archive.write(path, name)
+                yield sink.drain()
+        except errors as e:
+            archive.writestr(error_name, f"This archive is incomplete: {e}\n")
+    # The central directory is written on close
+    yield sink.drain()
+
+
+def serve_media(request, path):
+    """
+    Serve an uploaded file from MEDIA_ROOT to anyone. Outside DEBUG only the `MEDIA_PUBLIC_DIRS`
+    upload directories are served; reports, logbooks and other private files are only sent by
+    the views that check who is asking.
+    """
+    if not settings.DEBUG and path.split('/', 1)[0] not in settings.MEDIA_PUBLIC_DIRS:
+        raise Http404("File not found.")
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found.")
+    return serve_file(request, full_path, as_attachment=False)
@@ -1,197 +1,426 @@
-from django.http import FileResponse
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from datetime import datetime, timedelta
+from functools import lru_cache
+from io import BytesIO
+import json
+import textwrap
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Prefetch
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from apps.internships.models import Internship
-import os
-from datetime import datetime
-from django.conf import settings
-import google.generativeai as genai
+from apps.internships.models import Internship, LLMCallRecord, ReportJob
+from apps.logbook_entries.models import LogbookEntry
+from apps.weekly_logs.models import WeeklyLog
+from apps.utils.llm import CircuitBreaker, get_llm_client
+from apps.utils.llm_cache import cache_response, get_cached_response, llm_cache_key
 from docx import Document
 from docx.shared import Pt, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from io import BytesIO
-import textwrap
-
 
-class InternshipReportGenerateView(APIView):
-    permission_classes = [IsAuthenticated]
 
-    def post(self, request, internship_id):
-        try:
-            internship = Internship.objects.select_related(
-                'student__user', 'student__department__school',
-                'company', 'supervisor__user',
-                'logbook'
-            ).prefetch_related(
-                'logbook__weekly_logs__logbook_entries'
-            ).get(id=internship_id, student__user=request.user)
-
-            if internship.status != 'completed':
-                return Response({"error": "Internship must be completed before report generation."},
-                                status=status.HTTP_400_BAD_REQUEST)
-
-            if hasattr(internship, 'report_generated') and internship.report_generated:
-                return Response({"error": "Report has already been generated for this internship."},
-                                status=status.HTTP_400_BAD_REQUEST)
-
-            # Configure Gemini API
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            model = genai.GenerativeModel('gemini-2.0-flash')
-
-            # Generate content with specific instructions to avoid placeholders and options
-            prompt_template = """
-            Generate a professional internship report in first person perspective based on the following details.
-            Do not provide multiple options or placeholders - generate complete, finalized content.
-            Remove all markdown formatting like asterisks (*) and only include the actual content.
-
-            Student Name: {student_name}
-            Registration Number: {matricule}
-            Level: {level}
-            Department: {department}
-            School: {school}
-
-            Company Name: {company}
-            Supervisor Name: {supervisor}
-            Internship Duration: {start_date} to {end_date}
-            Job Description: {job_description}
-
-            Weekly Logs:
-            {weekly_logs}
-
-            The report should follow this structure:
-            1. Title Page
-            2. Dedication (single paragraph)
-            3. Acknowledgment (single paragraph)
-            4. Executive Summary
-            5. Chapter 1: Introduction
-               1.1 Overview
-               1.2 Objectives
-               1.3 Company Presentation
-            6. Chapter 2: Internship Activities (detailed by week)
-            7. Chapter 3: Technical Details
-            8. Chapter 4: Skills and Lessons
-            9. Chapter 5: Conclusion and Recommendations
-            10. References
-
-            Write in complete sentences and paragraphs, not bullet points.
-            """
-
-            # Format the prompt with actual data
-            prompt = prompt_template.format(
-                student_name=internship.student.user.full_name,
-                matricule=internship.student.matricule_num,
-                level=internship.student.level,
-                department=internship.student.department.name,
-                school=internship.student.department.school.name,
-                company=internship.company.name,
-                supervisor=internship.supervisor.user.full_name,
-                start_date=internship.start_date.strftime('%B %d, %Y'),
-                end_date=internship.end_date.strftime('%B %d, %Y'),
-                job_description=internship.job_description,
-                weekly_logs=self._format_weekly_logs(internship)
-            )
-
-            # Generate each section with specific instructions
-            dedication = model.generate_content(
+CHARS_PER_TOKEN = 4  # Rough size of a token in English prose
+CHARS_PER_WORD = 6
+
+REPORT_SECTIONS = [
+    'dedication',
+    'acknowledgment',
+    'executive_summary',
+    'introduction',
+    'activities',
+    'technical_details',
+    'skills_learned',
+    'conclusion',
+]
+
+
+@lru_cache(maxsize=1)
+def report_template():
+    """
+    The styled blank document every report starts from, built once per process and reopened
+    from bytes for each report.
+    """
+    document = Document()
+
+    # Set default font to Times New Roman, 12pt
+    style = document.styles['Normal']
+    font = style.font
+    font.name = 'Times New Roman'
+    font.size = Pt(12)
+
+    # Set line spacing to 1.5 for all text
+    paragraph_format = style.paragraph_format
+    paragraph_format.line_spacing = 1.5
+    paragraph_format.space_after = Pt(12)  # Add 12pt space after paragraphs
+
+    buffer = BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def report_internships():
+    """
+    Internships with everything a report needs, including the approved entries of every week,
+    loaded up front so building prompts never queries per week.
+    """
+    return Internship.objects.select_related(
+        'student__user', 'student__department__school',
+        'company', 'supervisor__user',
+        'logbook'
+    ).prefetch_related(
+        Prefetch('logbook__weekly_logs', queryset=WeeklyLog.objects.order_by('week_no')),
+        Prefetch('logbook__weekly_logs__logbook_entries',
+                 queryset=LogbookEntry.objects.filter(is_immutable=True).order_by('created_at'),
+                 to_attr='approved_entries'),
+    )
+
+
+def ordered_weekly_logs(internship):
+    return sorted(internship.logbook.weekly_logs.all(), key=lambda week: week.week_no)
+
+
+def approved_logbook_entries(week):
+    entries = getattr(week, 'approved_entries', None)
+    if entries is None:
+        entries = sorted((entry for entry in week.logbook_entries.all() if entry.is_immutable),
+                         key=lambda entry: entry.created_at)
+    return entries
+
+
+class InternshipReportBuilder:
+    """
+    Generates the AI-written sections of an internship report and lays them out as a Word document.
+    `progress_callback(section, state)` is called as each section starts, completes or fails.
+    Finished sections are cached by content address; `use_cache=False` skips reading the cache.
+    """
+    model_name = 'gemini-2.0-flash'
+
+    def __init__(self, internship, progress_callback=None, use_cache=True):
+        self.internship = internship
+        self.progress_callback = progress_callback
+        self.use_cache = use_cache
+        self._client = None
+        self._weekly_logs_digest = None
+
+    def build(self):
+        sections = self.generate_sections()
+        return self._create_word_document(self.internship, **sections)
+
+    def get_client(self):
+        if self._client is None:
+            self._client = get_llm_client(self.model_name)
+        return self._client
+
+    def build_prompts(self):
+        internship = self.internship
+        weekly_logs = self.summarise_weekly_logs()
+        return {
+            'dedication': (
                 f"Write a single paragraph dedication for an internship report by {internship.student.user.full_name}. "
                 "Do not provide options - write the actual dedication text only. "
                 "Example format: 'I dedicate this report to...'"
-            ).text.replace('*', '')
-
-            acknowledgment = model.generate_content(
+            ),
+            'acknowledgment': (
                 f"Write a single paragraph acknowledgment for an internship report thanking {internship.supervisor.user.full_name} "
                 f"and {internship.company.name}. Do not provide options - write the actual acknowledgment text only. "
                 "Example format: 'I would like to thank...'"
-            ).text.replace('*', '')
-
-            executive_summary = model.generate_content(
+            ),
+            'executive_summary': (
                 f"Write a professional executive summary (about 150 words) for an internship at {internship.company.name} "
                 f"as a {internship.job_description}. Focus on key achievements and learning outcomes."
-            ).text.replace('*', '')
-
-            introduction = model.generate_content(
+            ),
+            'introduction': (
                 f"Write a professional introduction chapter (about 300 words) for an internship report at {internship.company.name}. "
                 "Include: 1.1 Overview of the internship, 1.2 Clear objectives, and 1.3 Presentation of the company. "
                 "Write in complete paragraphs, not bullet points."
-            ).text.replace('*', '')
-
-            activities = model.generate_content(
-                f"Write a detailed chapter about internship activities based on these weekly logs: {self._format_weekly_logs(internship)}. "
+            ),
+            'activities': (
+                f"Write a detailed chapter about internship activities based on these weekly logs: {weekly_logs}. "
                 "Organize by week with specific tasks and accomplishments. Write in complete paragraphs."
-            ).text.replace('*', '')
-
-            technical_details = model.generate_content(
+            ),
+            'technical_details': (
                 "Write a technical details chapter describing projects worked on during the internship. "
+                f"Base it on these weekly summaries: {weekly_logs}. "
                 "Include technologies used and technical challenges overcome. Write in complete paragraphs."
-            ).text.replace('*', '')
-
-            skills_learned = model.generate_content(
+            ),
+            'skills_learned': (
                 "Write a skills acquired and lessons learned chapter for an internship report. "
+                f"Base it on these weekly summaries: {weekly_logs}. "
                 "Include both technical and soft skills. Write in complete paragraphs."
-            ).text.replace('*', '')
-
-            conclusion = model.generate_content(
+            ),
+            'conclusion': (
                 "Write a conclusion and recommendations chapter for an internship report. "
                 "Include 5.1 Conclusion summarizing the experience and 5.2 Recommendations for both the company and future interns. "
                 "Write in complete paragraphs."
-            ).text.replace('*', '')
+            ),
+        }
 
-            # Create Word document
-            document = self._create_word_document(
-                internship=internship,
-                dedication=dedication,
-                acknowledgment=acknowledgment,
-                executive_summary=executive_summary,
-                introduction=introduction,
-                activities=activities,
-                technical_details=technical_details,
-                skills_learned=skills_learned,
-                conclusion=conclusion
+    def generate_sections(self):
+        try:
+            return self._generate_sections()
+        finally:
+            self._save_call_records()
+
+    def _generate_sections(self):
+        prompts = self.build_prompts()
+        sections = self._assemble_presynthesised_sections()
+        sections.update(self._load_cached_sections(
+            {section: prompt for section, prompt in prompts.items() if section not in sections}
+        ))
+        missing = {section: prompt for section, prompt in prompts.items() if section not in sections}
+
+        if not missing:
+            return sections
+
+        client = self.get_client()
+
+        if settings.REPORT_GENERATION_MODE == 'structured':
+            self._generate_sections_structured(client, missing, sections)
+            # Only what the single call did not deliver goes through the per-section path
+            missing = {section: prompt for section, prompt in missing.items() if section not in sections}
+
+        if missing and settings.REPORT_SECTION_CONCURRENCY <= 1:
+            self._generate_sections_sequentially(client, missing, sections)
+        elif missing:
+            self._generate_sections_concurrently(client, missing, sections)
+
+        # Keep the document order stable regardless of completion order
+        return {section: sections[section] for section in prompts}
+
+    def _assemble_presynthesised_sections(self):
+        """
+        When every week already has its narrative (written as the weeks were approved), the
+        activities chapter is put together from them without another model call.
+        """
+        weeks = [week for week in ordered_weekly_logs(self.internship) if approved_logbook_entries(week)]
+        if not weeks or not all(week.narrative for week in weeks):
+            return {}
+        self._report_progress('activities', 'completed')
+        return {'activities': "\n".join(f"### Week {week.week_no}\n{week.narrative}" for week in weeks)}
+
+    def generate_week_narrative(self, week):
+        """Write and store the narrative paragraph for one approved week."""
+        entries = self._format_week(week)
+        if not entries:
+            return ''
+        prompt = (
+            f"Write a single first person paragraph (about 120 words) for the internship activities chapter of my "
+            f"report, describing what I did during week {week.week_no} of my internship at {self.internship.company.name}. "
+            f"Base it only on these approved logbook entries and do not use markdown.\n\n{entries}"
+        )
+        key = self._cache_key(prompt)
+        narrative = get_cached_response(key) if self.use_cache else None
+        if narrative is None:
+            try:
+                narrative = self._generate_section(self.get_client(), prompt, 'week_narrative')
+            finally:
+                self._save_call_records()
+            cache_response(key, self.get_client().model_name, f"week_{week.week_no}_narrative", narrative)
+        # A queryset update skips WeeklyLog.full_clean, which rejects saves outside the internship period
+        WeeklyLog.objects.filter(id=week.id).update(narrative=narrative)
+        week.narrative = narrative
+        return narrative
+
+    def _load_cached_sections(self, prompts):
+        sections = {}
+        if not self.use_cache:
+            return sections
+        for section, prompt in prompts.items():
+            content = get_cached_response(self._cache_key(prompt))
+            if content is not None:
+                sections[section] = content
+                self._report_progress(section, 'cached')
+        return sections
+
+    def _generate_sections_structured(self, client, prompts, sections):
+        """
+        Ask for every section in one JSON response. Sections that come back missing or invalid are
+        left out of `sections`, so the caller can fall back to per-section calls for just those.
+        """
+        for section in prompts:
+            self._report_progress(section, 'running')
+        try:
+            response = client.generate(
+                self._structured_prompt(prompts), json_output=True, timeout=settings.REPORT_STRUCTURED_TIMEOUT,
+                section='structured'
             )
-
-            # Save to media folder
-            file_path = self._save_report_to_media(document, internship)
-
-            # Mark internship as having report generated
-            internship.report_generated = True
-            internship.save()
-
-            return Response({
-                "message": "Report generated successfully",
-                "file_path": file_path
-            }, status=status.HTTP_201_CREATED)
-
+            generated = parse_structured_sections(response.text, prompts)
         except Exception as e:
-            print(f"Error generating report: {str(e)}")
-            return Response(
-                {"error": f"Error generating report: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            print(f"Structured report generation failed, falling back to per-section calls: {str(e)}")
+            generated = {}
+
+        for section, content in generated.items():
+            self._section_completed(section, prompts[section], content.replace('*', ''), sections)
+
+    def _structured_prompt(self, prompts):
+        instructions = "\n\n".join(f"{section}: {prompt}" for section, prompt in prompts.items())
+        return (
+            "Write the following sections of an internship report. "
+            f"Respond with a single JSON object whose keys are exactly: {', '.join(prompts)}. "
+            "Each value must be the complete text of that section as one string, with paragraphs separated "
+            "by newlines and no markdown formatting.\n\n"
+            f"{instructions}"
+        )
+
+    def _generate_sections_sequentially(self, client, prompts, sections):
+        for section, prompt in prompts.items():
+            self._report_progress(section, 'running')
+            try:
+                content = self._generate_section(client, prompt, section)
+            except Exception:
+                self._report_progress(section, 'failed')
+                raise
+            self._section_completed(section, prompt, content, sections)
+
+    def _generate_sections_concurrently(self, client, prompts, sections):
+        """
+        The sections do not depend on each other, so send the prompts in parallel on a bounded
+        thread pool. Progress and cache writes happen on this thread only, as results come back.
+        A failing section does not discard its siblings: everything that finishes is cached so a
+        retry only regenerates what is missing.
+        """
+        concurrency = min(settings.REPORT_SECTION_CONCURRENCY, len(prompts))
+        # A section may retry, back off and wait for rate limit tokens, so the batch allows that
+        # whole budget per wave. Past the shared deadline, section threads stop retrying instead of
+        # spending quota on results nobody collects.
+        waves = -(-len(prompts) // concurrency)
+        budget = client.call_budget(settings.REPORT_SECTION_TIMEOUT) * waves
+        deadline = time.monotonic() + budget
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='report-section')
+        futures = {}
+        errors = []
+        try:
+            for section, prompt in prompts.items():
+                futures[executor.submit(self._generate_section, client, prompt, section, deadline)] = section
+                self._report_progress(section, 'running')
+
+            try:
+                for future in as_completed(futures, timeout=budget):
+                    section = futures[future]
+                    try:
+                        content = future.result()
+                    except Exception as e:
+                        self._report_progress(section, 'failed')
+                        errors.append(e)
+                        continue
+                    self._section_completed(section, prompts[section], content, sections)
+            except FuturesTimeoutError:
+                pending = [section for future, section in futures.items() if not future.done()]
+                for section in pending:
+                    self._report_progress(section, 'failed')
+                raise TimeoutError(f"Timed out generating sections: {', '.join(pending)}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if errors:
+            raise errors[0]
+
+    def _generate_section(self, client, prompt, section, deadline=None):
+        return client.generate(
+            prompt, timeout=settings.REPORT_SECTION_TIMEOUT, section=section, deadline=deadline
+        ).text.replace('*', '')
+
+    def _save_call_records(self):
+        """Store the calls made so far. Runs on the builder's thread; section threads never touch the database."""
+        if self._client is None:
+            return
+        LLMCallRecord.objects.bulk_create(
+            LLMCallRecord(internship=self.internship, **record) for record in self._client.take_call_records()
+        )
+
+    def _section_completed(self, section, prompt, content, sections):
+        sections[section] = content
+        cache_response(self._cache_key(prompt), self.get_client().model_name, section, content)
+        self._report_progress(section, 'completed')
+
+    def _cache_key(self, prompt):
+        # The client's model name keeps fake and real generations apart
+        return llm_cache_key(self.get_client().model_name, prompt, self.internship.id)
+
+    def _report_progress(self, section, state):
+        if self.progress_callback:
+            self.progress_callback(section, state)
+
+    def summarise_weekly_logs(self):
+        """
+        Map-reduce the logbook into a prompt-sized digest. Each week is summarised on its own, in
+        parallel and through the response cache; the summaries are then joined and trimmed so the
+        whole digest stays within `REPORT_WEEKLY_LOGS_TOKEN_BUDGET`.
+        """
+        if self._weekly_logs_digest is not None:
+            return self._weekly_logs_digest
+
+        weeks = [week for week in ordered_weekly_logs(self.internship) if approved_logbook_entries(week)]
+        week_chars = settings.REPORT_WEEKLY_LOGS_TOKEN_BUDGET * CHARS_PER_TOKEN // max(len(weeks), 1)
+
+        # Narratives written at approval time already are the summary of their week
+        summaries = {week.week_no: week.narrative for week in weeks if week.narrative}
+        summaries.update(self._summarise_weeks(
+            [(week.week_no, self._format_week(week)) for week in weeks if not week.narrative], week_chars
+        ))
+        self._weekly_logs_digest = "\n\n".join(
+            f"Week {week.week_no}: {textwrap.shorten(summaries[week.week_no], week_chars, placeholder='...')}"
+            for week in weeks
+        )
+        return self._weekly_logs_digest
+
+    def _summarise_weeks(self, weeks, week_chars):
+        summaries = {}
+        prompts = {}
+        for week_no, text in weeks:
+            if len(text) <= week_chars:
+                # Short weeks already fit the budget and go in verbatim
+                summaries[week_no] = text
+                continue
+            prompt = (
+                f"Summarise these internship logbook entries for week {week_no} in a single first person paragraph "
+                f"of at most {week_chars // CHARS_PER_WORD} words. Keep the concrete tasks and what was accomplished. "
+                f"Do not use markdown.\n\n{text}"
             )
+            cached = get_cached_response(self._cache_key(prompt)) if self.use_cache else None
+            if cached is not None:
+                summaries[week_no] = cached
+            else:
+                prompts[week_no] = prompt
+
+        if not prompts:
+            return summaries
+
+        self._report_progress('weekly_summaries', 'running')
+        client = self.get_client()
+        concurrency = max(1, min(settings.REPORT_SECTION_CONCURRENCY, len(prompts)))
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='report-week') as executor:
+            futures = {
+                week_no: executor.submit(self._generate_section, client, prompt, 'weekly_summary')
+                for week_no, prompt in prompts.items()
+            }
+        for week_no, future in futures.items():
+            try:
+                summaries[week_no] = future.result()
+            except Exception as e:
+                # The trimmed raw entries are still better than failing the whole report
+                print(f"Error summarising week {week_no}: {str(e)}")
+                summaries[week_no] = dict(weeks)[week_no]
+            else:
+                cache_response(self._cache_key(prompts[week_no]), client.model_name, f"week_{week_no}_summary",
+                               summaries[week_no])
+        self._report_progress('weekly_summaries', 'completed')
+        return summaries
 
-    def _format_weekly_logs(self, internship):
-        logs = []
-        for week in internship.logbook.weekly_logs.all().order_by('week_no'):
-            entries = [f"Week {week.week_no}:"]
-            for entry in week.logbook_entries.filter(is_immutable=True).order_by('created_at'):
-                entries.append(f"- {entry.created_at.strftime('%B %d, %Y')}: {entry.description}")
-            logs.append("\n".join(entries))
-        return "\n\n".join(logs)
+    def _format_week(self, week):
+        return "\n".join(
+            f"- {entry.created_at.strftime('%B %d, %Y')}: {entry.description}"
+            for entry in approved_logbook_entries(week)
+        )
 
     def _create_word_document(self, internship, **sections):
-        document = Document()
-
-        # Set default font to Times New Roman, 12pt
-        style = document.styles['Normal']
-        font = style.font
-        font.name = 'Times New Roman'
-        font.size = Pt(12)
-
-        # Set line spacing to 1.5 for all text
-        paragraph_format = style.paragraph_format
-        paragraph_format.line_spacing = 1.5
-        paragraph_format.space_after = Pt(12)  # Add 12pt space after paragraphs
+        document = Document(BytesIO(report_template()))
 
         # Title Page
         self._add_title_page(document, internship)
@@ -304,28 +533,208 @@ class InternshipReportGenerateView(APIView):
         for ref in references:
             document.add_paragraph(ref, style='List Bullet')
 
-    def _save_report_to_media(self, document, internship):
-        try:
-            # Create the directory path
-            folder_name = 'internship_reports'
-            media_folder_path = os.path.join(settings.MEDIA_ROOT, folder_name)
+    def report_filename(self):
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        student_name = self.internship.student.user.full_name.replace(' ', '_')
+        return f"internship_report_{student_name}_{timestamp}.docx"
+
+
+def parse_structured_sections(text, expected_sections):
+    """
+    Validate a structured response: a JSON object mapping section names to non-empty strings.
+    Returns only the sections that pass; unknown keys are ignored.
+    """
+    text = text.strip()
+    if text.startswith('```'):
+        # Tolerate a fenced code block around the JSON
+        text = text.strip('`').removeprefix('json').strip()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {
+        section: data[section].strip()
+        for section in expected_sections
+        if isinstance(data.get(section), str) and data[section].strip()
+    }
+
+
+def save_report(internship, document, filename):
+    """Store the generated document in `Internship.report_file` and mark the report as generated."""
+    buffer = BytesIO()
+    document.save(buffer)
+    internship.report_file.save(filename, ContentFile(buffer.getvalue()), save=False)
+    internship.report_generated = True
+    internship.save(update_fields=['report_file', 'report_generated', 'updated_at'])
+    return internship.report_file.name
+
+
+def requeue_stale_report_jobs():
+    """Put jobs whose worker died mid-run back in the queue."""
+    threshold = timezone.now() - timedelta(seconds=settings.REPORT_JOB_STALE_AFTER)
+    return ReportJob.objects.filter(status='running', started_at__lt=threshold).update(status='queued')
+
+
+def fair_queue_order(jobs, running=()):
+    """
+    Order queued jobs round-robin across departments, and across students within a department,
+    keeping submission order inside each student's own jobs. `jobs` and `running` are lists of
+    `(id, department_id, student_id)` tuples, oldest first; running jobs count towards their
+    department's and student's share but are left out of the result. A term-end burst from one
+    department then cannot starve the others.
+    """
+    running_ids = {job_id for job_id, _, _ in running}
+    jobs = list(running) + list(jobs)
+    student_rounds = {}
+    by_department = {}
+    for position, (job_id, department_id, student_id) in enumerate(jobs):
+        student_round = student_rounds.get(student_id, 0)
+        student_rounds[student_id] = student_round + 1
+        by_department.setdefault(department_id, []).append((student_round, position, job_id))
+
+    ordered = []
+    for department_jobs in by_department.values():
+        for department_round, (_, position, job_id) in enumerate(sorted(department_jobs)):
+            ordered.append((department_round, position, job_id))
+    return [job_id for _, _, job_id in sorted(ordered) if job_id not in running_ids]
+
+
+def claim_next_report_job():
+    """
+    Atomically move the next queued job, in fair queue order, to `running`. The conditional
+    UPDATE makes this safe when several worker processes poll the same queue.
+    """
+    fields = ('id', 'internship__student__department_id', 'internship__student_id')
+    running = ReportJob.objects.filter(status='running').order_by('started_at').values_list(*fields)
+    queued = ReportJob.objects.filter(status='queued').order_by('created_at').values_list(*fields)
+    for job_id in fair_queue_order(queued[:settings.REPORT_JOB_QUEUE_WINDOW], running)[:10]:
+        claimed = ReportJob.objects.filter(id=job_id, status='queued').update(
+            status='running', started_at=timezone.now()
+        )
+        if claimed:
+            return ReportJob.objects.get(id=job_id)
+    return None
+
+
+def queue_week_narrative(weekly_log):
+    """Queue the narrative for a week that was just approved, so the final report has less to generate."""
+    if not settings.REPORT_PREGENERATE_WEEK_NARRATIVES or weekly_log.narrative:
+        return None
+    return ReportJob.objects.create(
+        kind='week_narrative',
+        internship_id=weekly_log.logbook.internship_id,
+        weekly_log=weekly_log,
+        progress={'narrative': 'pending'}
+    )
+
+
+def run_report_job(job):
+    """Run a claimed job, recording per-section progress on the job row."""
+    def update_progress(section, state):
+        job.progress[section] = state
+        job.save(update_fields=['progress', 'updated_at'])
+
+    try:
+        internship = report_internships().get(id=job.internship_id)
+        builder = InternshipReportBuilder(internship, progress_callback=update_progress, use_cache=job.use_cache)
+
+        if job.kind == 'week_narrative':
+            week = next(week for week in ordered_weekly_logs(internship) if week.id == job.weekly_log_id)
+            update_progress('narrative', 'running')
+            builder.generate_week_narrative(week)
+            update_progress('narrative', 'completed')
+        else:
+            document = builder.build()
+            save_report(internship, document, builder.report_filename())
+
+        job.status = 'completed'
+        job.error = ''
+    except Exception as e:
+        print(f"Error generating report for job {job.id}: {str(e)}")
+        job.status = 'failed'
+        job.error = str(e)
+        # Sections still in flight when a sibling failed are abandoned with the job
+        for section, state in job.progress.items():
+            if state == 'running':
+                job.progress[section] = 'failed'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'progress', 'finished_at', 'updated_at'])
+    return job
+
+
+def serialize_report_job(job, request):
+    data = {
+        "job_id": job.id,
+        "internship_id": job.internship_id,
+        "status": job.status,
+        "progress": job.progress,
+        "use_cache": job.use_cache,
+        "error": job.error or None,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "status_url": request.build_absolute_uri(
+            reverse('internship-report-job', kwargs={'internship_id': job.internship_id, 'job_id': job.id})
+        ),
+    }
+    if job.status == 'completed' and job.internship.report_file:
+        data["file_path"] = job.internship.report_file.name
+    return data
 
-            # Ensure the directory exists
-            os.makedirs(media_folder_path, exist_ok=True)
 
-            # Create filename
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            student_name = internship.student.user.full_name.replace(' ', '_')
-            filename = f"internship_report_{student_name}_{timestamp}.docx"
-            file_path = os.path.join(media_folder_path, filename)
+class InternshipReportGenerateView(APIView):
+    permission_classes = [IsAuthenticated]
 
-            # Save the document
-            document.save(file_path)
+    def post(self, request, internship_id):
+        try:
+            internship = Internship.objects.get(id=internship_id, student__user=request.user)
+        except Internship.DoesNotExist:
+            return Response({"error": "Internship not found or unauthorized."}, status=status.HTTP_404_NOT_FOUND)
+
+        if internship.status != 'completed':
+            return Response({"error": "Internship must be completed before report generation."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if internship.report_generated:
+            return Response({"error": "Report has already been generated for this internship."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Don't queue work the worker would only fail: tell the client when to come back instead
+        breaker = CircuitBreaker(settings.LLM_BACKEND)
+        if breaker.is_open():
+            response = Response({"error": "Report generation is temporarily unavailable. Please try again later."},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = str(breaker.retry_after())
+            return response
+
+        # Only one job per internship can be in flight; re-posting returns the existing one
+        job = internship.report_jobs.filter(kind='report', status__in=['queued', 'running']).first()
+        if job is None:
+            job = ReportJob.objects.create(
+                internship=internship,
+                requested_by=request.user,
+                progress={section: 'pending' for section in REPORT_SECTIONS},
+                # `{"use_cache": false}` forces every section to be regenerated
+                use_cache=str(request.data.get('use_cache', True)).lower() not in ('false', '0')
+            )
 
-            print(f"Report saved successfully at: {file_path}")
+        return Response({
+            "message": "Report generation queued.",
+            **serialize_report_job(job, request)
+        }, status=status.HTTP_202_ACCEPTED)
 
-            return os.path.join(folder_name, filename)
 
-        except Exception as e:
-            print(f"Error saving report to media folder: {str(e)}")
-            raise
\ No newline at end of file
+class InternshipReportJobStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, internship_id, job_id):
+        try:
+            job = ReportJob.objects.select_related('internship').get(
+                id=job_id, kind='report', internship_id=internship_id, internship__student__user=request.user
+            )
+        except ReportJob.DoesNotExist:
+            return Response({"error": "Report job not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(serialize_report_job(job, request), status=status.HTTP_200_OK)
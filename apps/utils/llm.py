@@ -0,0 +1,382 @@
+import json
+import math
+import random
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+
+class LLMError(Exception):
+    """A model call failed."""
+
+
+class LLMTransientError(LLMError):
+    """A failure worth retrying: the same request may succeed a moment later."""
+
+
+class LLMRateLimitError(LLMTransientError):
+    """The provider rejected the call because a quota was exhausted (HTTP 429)."""
+
+
+class LLMTimeoutError(LLMTransientError):
+    """The call did not finish within its deadline."""
+
+
+class LLMUnavailableError(LLMError):
+    """The circuit breaker is open: the provider is failing, so calls are refused without being sent."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMResponse:
+    def __init__(self, text, prompt_tokens=None, response_tokens=None, total_tokens=None):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.response_tokens = response_tokens
+        self.total_tokens = total_tokens
+
+
+class LLMClient:
+    """
+    Interface for text generation backends. `generate` returns an `LLMResponse` and raises
+    `LLMError` subclasses, so callers never depend on a provider's own exception types.
+    """
+    model_name = ''
+
+    def generate(self, prompt, json_output=False, timeout=None):
+        raise NotImplementedError
+
+
+class GeminiClient(LLMClient):
+    def __init__(self, model_name):
+        # Configure Gemini API
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self.model_name = model_name
+        self._model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt, json_output=False, timeout=None):
+        kwargs = {}
+        if json_output:
+            kwargs['generation_config'] = {'response_mime_type': 'application/json'}
+        if timeout:
+            kwargs['request_options'] = {'timeout': timeout}
+
+        try:
+            response = self._model.generate_content(prompt, **kwargs)
+        except google_exceptions.ResourceExhausted as e:
+            raise LLMRateLimitError(str(e)) from e
+        except google_exceptions.DeadlineExceeded as e:
+            raise LLMTimeoutError(str(e)) from e
+        except (google_exceptions.ServiceUnavailable, google_exceptions.InternalServerError) as e:
+            raise LLMTransientError(str(e)) from e
+        except google_exceptions.GoogleAPIError as e:
+            raise LLMError(str(e)) from e
+
+        usage = getattr(response, 'usage_metadata', None)
+        return LLMResponse(
+            response.text,
+            prompt_tokens=getattr(usage, 'prompt_token_count', None),
+            response_tokens=getattr(usage, 'candidates_token_count', None),
+            total_tokens=getattr(usage, 'total_token_count', None),
+        )
+
+
+class FakeLLMClient(LLMClient):
+    """
+    Local stand-in for Gemini, for load tests and CI without network access. Returns templated
+    text after a configurable latency (plus or minus jitter) and fails a configurable share of
+    calls with rate-limit or server (5xx) errors, raised as the same transient errors GeminiClient
+    maps them to.
+    """
+
+    def __init__(self, model_name='fake', latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 words=120, seed=None):
+        self.model_name = f"fake-{model_name}"
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.words = words
+        self._random = random.Random(seed)
+
+    def generate(self, prompt, json_output=False, timeout=None):
+        delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        if timeout and delay > timeout:
+            time.sleep(timeout)
+            raise LLMTimeoutError(f"Fake model did not answer within {timeout}s")
+        time.sleep(delay)
+
+        roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            raise LLMRateLimitError("429 Resource has been exhausted (fake)")
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise LLMTransientError("500 Internal error (fake)")
+
+        if json_output:
+            text = json.dumps({key: self._paragraph(key) for key in self._requested_keys(prompt)})
+        else:
+            text = self._paragraph(prompt)
+        prompt_tokens = len(prompt) // 4
+        response_tokens = len(text) // 4
+        return LLMResponse(text, prompt_tokens, response_tokens, prompt_tokens + response_tokens)
+
+    def _paragraph(self, topic):
+        words = re.findall(r'[A-Za-z]+', topic)[:12] or ['internship']
+        return " ".join(words[i % len(words)] for i in range(self.words)).capitalize() + "."
+
+    def _requested_keys(self, prompt):
+        match = re.search(r'keys are exactly: ([\w, ]+)\.', prompt)
+        return [key.strip() for key in match.group(1).split(',')] if match else []
+
+
+# Breaker and rate limiter state, in a cache of its own that bulk data can never push out
+llm_state = ConnectionProxy(caches, 'llm_state')
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. The state lives in the shared `llm_state` cache so that every worker
+    stops calling a failing provider together. After `LLM_BREAKER_FAILURE_THRESHOLD` transient
+    failures in a row the breaker opens for `LLM_BREAKER_RESET_TIMEOUT` seconds; once that has
+    passed a single trial call is let through, and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, name, failure_threshold=None, reset_timeout=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.LLM_BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or settings.LLM_BREAKER_RESET_TIMEOUT
+        self._failures_key = f"llm-breaker:{name}:failures"
+        self._open_until_key = f"llm-breaker:{name}:open-until"
+        self._trial_key = f"llm-breaker:{name}:trial"
+
+    def is_open(self):
+        """True while calls are being refused. Unlike `allow_request`, never starts a trial call."""
+        return self.retry_after() > 0
+
+    def retry_after(self):
+        """Seconds until the breaker lets a trial call through."""
+        open_until = llm_state.get(self._open_until_key)
+        if open_until is None:
+            return 0
+        return max(0, math.ceil(open_until - time.time()))
+
+    def allow_request(self):
+        open_until = llm_state.get(self._open_until_key)
+        if open_until is None:
+            return True
+        if open_until > time.time():
+            return False
+        # Half-open: only the caller that wins this add makes the trial call. The claim expires
+        # after a reset timeout in case its worker dies before reporting back.
+        return llm_state.add(self._trial_key, True, timeout=self.reset_timeout)
+
+    def record_success(self):
+        if llm_state.get(self._failures_key) or llm_state.get(self._open_until_key) is not None:
+            llm_state.delete_many([self._failures_key, self._open_until_key, self._trial_key])
+
+    def record_failure(self):
+        if llm_state.add(self._failures_key, 1, timeout=None):
+            failures = 1
+        else:
+            try:
+                failures = llm_state.incr(self._failures_key)
+            except ValueError:
+                # Deleted by a concurrent success since the add: this failure starts a new run
+                llm_state.set(self._failures_key, 1, timeout=None)
+                failures = 1
+        # A failed trial re-opens the breaker straight away
+        if failures >= self.failure_threshold or llm_state.get(self._open_until_key) is not None:
+            llm_state.set(self._open_until_key, time.time() + self.reset_timeout, timeout=None)
+            llm_state.delete(self._trial_key)
+
+
+class RateLimiter:
+    """
+    Token bucket shared through the `llm_state` cache, so all workers together stay under the
+    provider quota. That only holds with a cache every process sees (Redis or the database cache,
+    as configured in settings), not a per-process one. The bucket refills at `rate` tokens per second up to
+    `capacity`; each call takes one token. Updates are serialised with a short-lived cache lock.
+    """
+
+    def __init__(self, name, rate=None, capacity=None):
+        self.rate = settings.LLM_RATE_LIMIT_PER_MINUTE / 60 if rate is None else rate
+        self.capacity = settings.LLM_RATE_LIMIT_BURST if capacity is None else capacity
+        self._bucket_key = f"llm-rate:{name}:bucket"
+        self._lock_key = f"llm-rate:{name}:lock"
+
+    def try_acquire(self):
+        """Take a token if one is available. Returns 0 on success, otherwise the seconds to wait."""
+        if not self.rate:
+            return 0
+        while not llm_state.add(self._lock_key, True, timeout=5):
+            time.sleep(0.01)
+        try:
+            now = time.time()
+            tokens, updated = llm_state.get(self._bucket_key) or (self.capacity, now)
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                llm_state.set(self._bucket_key, (tokens - 1, now), timeout=None)
+                return 0
+            llm_state.set(self._bucket_key, (tokens, now), timeout=None)
+            return (1 - tokens) / self.rate
+        finally:
+            llm_state.delete(self._lock_key)
+
+    def acquire(self, deadline=None):
+        """
+        Block until a token is available. With a `deadline` (a `time.monotonic()` value), gives up
+        and returns False once the next token would come too late.
+        """
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            # Jitter so that waiting workers don't all wake on the same refill
+            delay = wait + random.uniform(0, wait)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                return False
+            time.sleep(delay)
+
+
+class ResilientLLMClient(LLMClient):
+    """
+    Wraps a client with rate limiting, retries and a circuit breaker. Every attempt waits for a
+    rate limiter token. Transient errors (rate limits, timeouts, 5xx) are retried with jittered
+    exponential backoff; every other error is raised at once. Each attempt keeps the caller's
+    `timeout`. An optional `deadline` bounds the whole call, retries and waits included: no
+    attempt, backoff or token wait runs past it.
+
+    Every attempt is also noted in `call_records` (size, tokens, latency and outcome, labelled
+    with the caller's `section`), for the caller to persist with `take_call_records`. Calls run
+    on worker threads, so nothing is written to the database here.
+    """
+
+    def __init__(self, client, breaker, rate_limiter=None, max_retries=None, base_delay=None, max_delay=None):
+        self.client = client
+        self.breaker = breaker
+        self.rate_limiter = rate_limiter
+        self.max_retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.base_delay = settings.LLM_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = settings.LLM_RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.call_records = []
+
+    @property
+    def model_name(self):
+        return self.client.model_name
+
+    def call_budget(self, timeout):
+        """
+        Longest a `generate` call with this per-attempt `timeout` can take when nothing else is
+        drawing from the rate limiter: every attempt, each preceded by a token wait, plus the
+        longest backoff between them.
+        """
+        attempts = self.max_retries + 1
+        backoff = sum(min(self.max_delay, self.base_delay * 2 ** attempt) for attempt in range(self.max_retries))
+        rate = self.rate_limiter.rate if self.rate_limiter is not None else 0
+        # A token wait sleeps up to twice the refill interval because of its jitter
+        token_wait = 2 / rate if rate else 0
+        return attempts * (timeout + token_wait) + backoff
+
+    def generate(self, prompt, json_output=False, timeout=None, section='', deadline=None):
+        if not self.breaker.allow_request():
+            error = LLMUnavailableError(
+                f"The {self.breaker.name} model is unavailable, try again later",
+                retry_after=self.breaker.retry_after(),
+            )
+            self._record_call(section, prompt, 0, time.monotonic(), error=error)
+            raise error
+
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            if self.rate_limiter is not None and not self.rate_limiter.acquire(deadline):
+                error = LLMTimeoutError("No rate limit token before the call's deadline")
+                self._record_call(section, prompt, attempt, started, error=error)
+                raise error
+            started = time.monotonic()
+            attempt_timeout = timeout
+            if deadline is not None:
+                remaining = deadline - started
+                if remaining <= 0:
+                    error = LLMTimeoutError("The call's deadline passed before it could be sent")
+                    self._record_call(section, prompt, attempt, started, error=error)
+                    raise error
+                attempt_timeout = min(timeout, remaining) if timeout else remaining
+            try:
+                response = self.client.generate(prompt, json_output=json_output, timeout=attempt_timeout)
+            except LLMTransientError as e:
+                self._record_call(section, prompt, attempt, started, error=e)
+                self.breaker.record_failure()
+                if attempt == self.max_retries or not self.breaker.allow_request():
+                    raise
+                delay = self.backoff(attempt)
+                # A retry that could only start after the deadline would be wasted quota
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise
+                time.sleep(delay)
+                continue
+            except Exception as e:
+                self._record_call(section, prompt, attempt, started, error=e)
+                raise
+            self._record_call(section, prompt, attempt, started, response=response)
+            self.breaker.record_success()
+            return response
+
+    def take_call_records(self):
+        """Return the calls noted so far and start a new list."""
+        records, self.call_records = self.call_records, []
+        return records
+
+    def _record_call(self, section, prompt, attempt, started, response=None, error=None):
+        if response is not None:
+            outcome = 'success'
+        elif isinstance(error, LLMRateLimitError):
+            outcome = 'rate_limited'
+        elif isinstance(error, LLMTimeoutError):
+            outcome = 'timeout'
+        elif isinstance(error, LLMUnavailableError):
+            outcome = 'unavailable'
+        else:
+            outcome = 'error'
+        # list.append is atomic, so section threads can share the list
+        self.call_records.append({
+            'section': section,
+            'model_name': self.model_name,
+            'attempt': attempt + 1,
+            'prompt_chars': len(prompt),
+            'response_chars': len(response.text) if response is not None else 0,
+            'prompt_tokens': getattr(response, 'prompt_tokens', None),
+            'response_tokens': getattr(response, 'response_tokens', None),
+            'total_tokens': getattr(response, 'total_tokens', None),
+            'latency': time.monotonic() - started,
+            'outcome': outcome,
+            'error': str(error) if error is not None else '',
+        })
+
+    def backoff(self, attempt):
+        # "Full jitter": spread retries from many workers over the whole backoff window
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def get_llm_client(model_name):
+    """
+    The client selected by `LLM_BACKEND`, wrapped with the backend's shared rate limiter,
+    retries and circuit breaker.
+    """
+    if settings.LLM_BACKEND == 'fake':
+        client = FakeLLMClient(
+            model_name,
+            latency=settings.FAKE_LLM_LATENCY,
+            jitter=settings.FAKE_LLM_JITTER,
+            error_rate=settings.FAKE_LLM_ERROR_RATE,
+            rate_limit_rate=settings.FAKE_LLM_RATE_LIMIT_RATE,
+        )
+    else:
+        client = GeminiClient(model_name)
+    return ResilientLLMClient(client, CircuitBreaker(settings.LLM_BACKEND), RateLimiter(settings.LLM_BACKEND))
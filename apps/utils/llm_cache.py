@@ -0,0 +1,53 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.internships.models import LLMResponseCache
+
+
+def llm_cache_key(model_name, prompt, *scope):
+    """Content address for a generation: same model, same prompt and same scope give the same key."""
+    payload = json.dumps([model_name, prompt, *[str(part) for part in scope]])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_cached_response(key):
+    entry = LLMResponseCache.objects.filter(key=key).only('content').first()
+    if entry is None:
+        return None
+    LLMResponseCache.objects.filter(id=entry.id).update(last_used_at=timezone.now())
+    return entry.content
+
+
+def cache_response(key, model_name, section, content):
+    LLMResponseCache.objects.update_or_create(
+        key=key,
+        defaults={
+            'model_name': model_name,
+            'section': section,
+            'content': content,
+            'size': len(content.encode()),
+            'last_used_at': timezone.now(),
+        }
+    )
+    evict_cached_responses()
+
+
+def evict_cached_responses(max_bytes=None):
+    """Drop the least recently used entries until the cache fits in `LLM_CACHE_MAX_BYTES`."""
+    max_bytes = settings.LLM_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    total = LLMResponseCache.objects.aggregate(total=Sum('size'))['total'] or 0
+    if total <= max_bytes:
+        return 0
+
+    stale_ids = []
+    for entry_id, size in LLMResponseCache.objects.order_by('last_used_at').values_list('id', 'size'):
+        if total <= max_bytes:
+            break
+        stale_ids.append(entry_id)
+        total -= size
+    LLMResponseCache.objects.filter(id__in=stale_ids).delete()
+    return len(stale_ids)
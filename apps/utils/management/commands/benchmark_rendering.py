@@ -0,0 +1,241 @@
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+from io import BytesIO
+
+import reportlab
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.academic_years.models import AcademicYear
+from apps.companies.models import Company
+from apps.departments.models import Department, School
+from apps.evaluation_categories.models import EvaluationCategory
+from apps.evaluation_category_subfields.models import EvaluationCategorySubfield, EvaluationSubfieldTemplate
+from apps.evaluations.models import Evaluation, EvaluationTemplate
+from apps.evaluations.utils import evaluation_pdf_queryset, generate_evaluation_pdf
+from apps.internships.models import Internship
+from apps.logbook_entries.models import LogbookEntry
+from apps.logbooks.models import Logbook
+from apps.logbooks.utils import generate_logbook_pdf, logbook_pdf_queryset
+from apps.students.models import Student
+from apps.supervisors.models import Supervisor
+from apps.users.models import User
+from apps.utils.internship_report import REPORT_SECTIONS, InternshipReportBuilder
+from apps.weekly_logs.models import WeeklyLog
+
+ENTRY_TEXT = (
+    "Implemented and reviewed changes to the internal inventory service, wrote unit tests for the new "
+    "endpoints, paired with a senior engineer on a database migration and documented the deployment steps. "
+)
+METRICS = [('wall_time', 'Time (s)', 1), ('peak_memory', 'Peak (KiB)', 1024), ('output_size', 'Size (KiB)', 1024)]
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'apps', 'utils', 'benchmarks', 'rendering.json')
+
+
+class Command(BaseCommand):
+    help = ('Benchmark logbook and evaluation PDFs and the Word report on synthetic data, optionally '
+            'comparing against a baseline. Nothing is kept: the data is created in a rolled-back transaction. '
+            'Only runs with DEBUG on, unless --force is given')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--weeks', type=int, nargs='+', default=[4, 12, 24, 52],
+                            help='Logbook lengths, in weeks, to benchmark')
+        parser.add_argument('--rounds', type=int, default=3, help='Timed renders per case; the median is reported')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                            help='JSON results of an earlier run to compare against (defaults to the committed baseline)')
+        parser.add_argument('--no-baseline', action='store_true', help='Only measure, without comparing')
+        parser.add_argument('--force', action='store_true',
+                            help='Run with DEBUG off; synthetic rows are still written to the configured database')
+        parser.add_argument('--time-tolerance', type=float,
+                            help='Fail on a slowdown over the baseline larger than this fraction. Timings vary '
+                                 'between machines and runs, so by default they are shown but never fail the run')
+        parser.add_argument('--memory-tolerance', type=float, default=0.10,
+                            help='Allowed growth of peak memory and output size over the baseline, as a fraction')
+
+    def handle(self, *args, **options):
+        # The synthetic schools, users and internships only disappear if the rollback does
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Refusing to write benchmark data with DEBUG off; run against a development "
+                               "database, or pass --force")
+
+        baseline = None
+        if options['baseline'] and not options['no_baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)['results']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        results = {}
+        with transaction.atomic():
+            fixtures = self._create_fixtures()
+            for weeks in sorted(set(options['weeks'])):
+                internship = self._create_internship(fixtures, weeks)
+                logbook = logbook_pdf_queryset().get(internship=internship)
+                results[f'logbook_pdf_{weeks}w'] = self._measure(
+                    lambda: generate_logbook_pdf(logbook).getvalue(), options['rounds']
+                )
+                sections = self._report_sections(weeks)
+                # python-docx builds the document in lxml, whose allocations tracemalloc cannot see
+                results[f'report_docx_{weeks}w'] = self._measure(
+                    lambda: self._render_report(internship, sections), options['rounds'], trace_memory=False
+                )
+            evaluation = evaluation_pdf_queryset().get(id=self._create_evaluation(fixtures, internship).id)
+            results['evaluation_pdf'] = self._measure(
+                lambda: generate_evaluation_pdf(evaluation).getvalue(), options['rounds']
+            )
+            transaction.set_rollback(True)
+
+        regressions = self._report(results, baseline, options['time_tolerance'], options['memory_tolerance'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'created_at': timezone.now().isoformat(),
+                    'python': platform.python_version(),
+                    'reportlab': reportlab.Version,
+                    'rounds': options['rounds'],
+                    'results': results,
+                }, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if regressions:
+            raise CommandError("Rendering regressions: " + ", ".join(regressions))
+
+    def _measure(self, render, rounds, trace_memory=True):
+        durations = []
+        for _ in range(max(rounds, 1)):
+            started = time.perf_counter()
+            output = render()
+            durations.append(time.perf_counter() - started)
+        peak = None
+        if trace_memory:
+            # Measured in a separate render, as tracing allocations slows everything down
+            tracemalloc.start()
+            try:
+                render()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        return {'wall_time': round(statistics.median(durations), 4), 'peak_memory': peak, 'output_size': len(output)}
+
+    def _report(self, results, baseline, time_tolerance, memory_tolerance):
+        header = f"{'Case':<20}" + "".join(f"{label:>14}{'vs base':>10}" for _, label, _ in METRICS)
+        self.stdout.write(header)
+        regressions = []
+        for case, result in results.items():
+            line = f"{case:<20}"
+            for metric, _, unit in METRICS:
+                if result[metric] is None:
+                    line += f"{'n/a':>14}{'':>10}"
+                    continue
+                line += f"{result[metric] / unit:>14.2f}"
+                base = (baseline or {}).get(case, {}).get(metric)
+                if not base:
+                    line += f"{'':>10}"
+                    continue
+                change = result[metric] / base - 1
+                line += f"{change:>+10.0%}"
+                tolerance = time_tolerance if metric == 'wall_time' else memory_tolerance
+                if tolerance is not None and change > tolerance:
+                    regressions.append(f"{case} {metric} {change:+.0%}")
+            self.stdout.write(line)
+        self.stdout.write("Peak memory is not measured for Word reports: lxml allocates outside Python's tracing.")
+        if baseline and time_tolerance is None:
+            self.stdout.write("Times are for information only; pass --time-tolerance to fail on slowdowns.")
+        return regressions
+
+    def _render_report(self, internship, sections):
+        buffer = BytesIO()
+        InternshipReportBuilder(internship)._create_word_document(internship, **sections).save(buffer)
+        return buffer.getvalue()
+
+    def _create_fixtures(self):
+        suffix = uuid.uuid4().hex[:8]
+        school = School.objects.create(name="Benchmark School")
+        department = Department.objects.create(name="Benchmark Department", school=school)
+        company = Company.objects.create(
+            name="Benchmark Corp", address="1 Benchmark Street", contact="+237600000000",
+            email=f"benchmark-{suffix}@example.invalid", division="Engineering", designation="Manager"
+        )
+        supervisor = Supervisor.objects.create(
+            user=User.objects.create_user(email=f"benchmark-supervisor-{suffix}@example.invalid",
+                                          full_name="Benchmark Supervisor", contact="+237600000000",
+                                          role="supervisor"),
+            company=company, status="approved"
+        )
+        return {
+            'suffix': suffix,
+            'department': department,
+            'company': company,
+            'supervisor': supervisor,
+            'academic_year': AcademicYear.objects.create(start_year=2024, end_year=2025),
+        }
+
+    def _create_internship(self, fixtures, weeks):
+        user = User.objects.create_user(
+            email=f"benchmark-student-{weeks}-{fixtures['suffix']}@example.invalid",
+            full_name=f"Benchmark Student {weeks}", contact="+237600000000", role="student"
+        )
+        student = Student.objects.create(user=user, department=fixtures['department'],
+                                         matricule_num="UBa25E0001", level="400")
+        today = timezone.now()
+        start = today - timedelta(days=today.weekday(), weeks=weeks)
+        internship = Internship.objects.create(
+            student=student, company=fixtures['company'], academic_year=fixtures['academic_year'],
+            supervisor=fixtures['supervisor'], start_date=start, end_date=today + timedelta(days=1),
+            job_description="Backend developer\nMaintained internal services\nWrote tests\nReviewed code",
+        )
+        logbook = Logbook.objects.create(internship=internship)
+
+        # Bulk inserts skip the per-save validation, which only allows the current week
+        weekly_logs = WeeklyLog.objects.bulk_create(
+            WeeklyLog(logbook=logbook, week_no=week_no) for week_no in range(1, weeks + 1)
+        )
+        entries = LogbookEntry.objects.bulk_create(
+            LogbookEntry(weekly_log=week, description=f"Day {day + 1}. " + ENTRY_TEXT * 4, is_immutable=True)
+            for week in weekly_logs for day in range(5)
+        )
+        # One entry per weekday, as the layout places entries by the day they were written
+        for index, entry in enumerate(entries):
+            entry.created_at = start + timedelta(weeks=index // 5, days=index % 5)
+        LogbookEntry.objects.bulk_update(entries, ['created_at'])
+        return internship
+
+    def _create_evaluation(self, fixtures, internship):
+        evaluation = Evaluation.objects.create(
+            internship=internship,
+            comments="\n".join(f"Observation {line + 1}: {ENTRY_TEXT[:90]}" for line in range(80)),
+        )
+        for order in range(1, 6):
+            template = EvaluationTemplate.objects.create(name=f"BENCHMARK {fixtures['suffix']} {order}", order=order)
+            category = EvaluationCategory.objects.create(evaluation=evaluation, template=template)
+            EvaluationCategorySubfield.objects.bulk_create(
+                EvaluationCategorySubfield(
+                    category=category, score=4,
+                    template=EvaluationSubfieldTemplate.objects.create(
+                        category=template, name=f"Benchmark criterion {subfield}", order=subfield
+                    ),
+                )
+                for subfield in range(1, 5)
+            )
+            EvaluationCategory.objects.filter(id=category.id).update(subfields_total=16)
+        Evaluation.objects.filter(id=evaluation.id).update(total_score=80)
+        return evaluation
+
+    def _report_sections(self, weeks):
+        paragraph = ENTRY_TEXT * 3
+        sections = {section: "\n".join([paragraph] * 6) for section in REPORT_SECTIONS}
+        sections['activities'] = "\n".join(
+            f"### Week {week}\n" + "\n".join([paragraph] * 5) for week in range(1, weeks + 1)
+        )
+        sections['technical_details'] = "\n".join(
+            f"### Project {project}\n" + "\n".join([paragraph] * 4) for project in range(1, weeks // 4 + 2)
+        )
+        return sections
@@ -0,0 +1,54 @@
+import glob
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+
+
+def content_version(*parts):
+    """A short, stable hash of everything a rendered file depends on."""
+    return hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()[:16]
+
+
+def media_path(directory, name, version, extension='pdf'):
+    """Where `cached_media_file` keeps this version of a file."""
+    return os.path.join(settings.MEDIA_ROOT, directory, f"{name}_{version}.{extension}")
+
+
+def cached_media_file(directory, name, version, render, extension='pdf'):
+    """
+    Return the path of `MEDIA_ROOT/<directory>/<name>_<version>.<extension>`, calling `render()`
+    (which returns the file's bytes or a file object, closed once copied) only when that version
+    is not on disk yet.
+    Writing a new version removes the older ones for the same name, so the directory holds at
+    most one file per name.
+    """
+    path = media_path(directory, name, version, extension)
+    target_dir = os.path.dirname(path)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(target_dir, exist_ok=True)
+    content = render()
+
+    # Write under a temporary name and rename, so a concurrent download never reads half a file
+    fd, tmp_path = tempfile.mkstemp(dir=target_dir, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        if isinstance(content, bytes):
+            f.write(content)
+        else:
+            # Copied in chunks, so a render spooled to disk is never read into memory whole
+            with content:
+                content.seek(0)
+                shutil.copyfileobj(content, f)
+    os.replace(tmp_path, path)
+
+    for stale in glob.glob(os.path.join(target_dir, f"{glob.escape(name)}_*.{extension}")):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass  # Already pruned by another worker
+    return path
@@ -0,0 +1,156 @@
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from apps.utils import render_workers
+
+
+class RenderUnavailable(Exception):
+    """A render could not be done now; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RenderServiceBusy(RenderUnavailable):
+    pass
+
+
+class RenderTimeout(RenderUnavailable):
+    pass
+
+
+class RenderService:
+    """
+    Runs PDF renders in a pool of warm worker processes, so ReportLab's GIL-bound layout work never
+    stalls the threads serving other requests. At most `queue_depth` renders are running or waiting
+    at once; past that, `render` refuses straight away with RenderServiceBusy instead of queueing.
+    A render that takes longer than `timeout` raises RenderTimeout, but it keeps its slot and carries
+    on in its process, so a cached result is usually there when the client retries.
+    With `workers=0` renders run in the calling thread, still bounded by `queue_depth`.
+    """
+
+    def __init__(self, workers, queue_depth, timeout, retry_after, max_tasks_per_worker=None):
+        self.workers = workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(queue_depth)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def render(self, func, *args):
+        """Return `func(*args)`; `func` must be a module-level function of render_workers."""
+        return self._result(self._submit(func, args, wait=False), timeout=self.timeout)
+
+    def map(self, func, args_list):
+        """
+        Return an iterator over `func(*args)` for each tuple in `args_list`, in order. Up to
+        `workers` renders are kept in flight, through the same pool and slots as `render`. The
+        first render is submitted here, so a saturated service raises RenderServiceBusy before a
+        response has started. Later renders wait for a free slot for as long as it takes, as the
+        renders holding the slots are bounded too; every result is waited for at most `timeout`,
+        so a hung render ends the iteration with RenderTimeout.
+        """
+        args_list = list(args_list)
+        if not args_list:
+            return iter(())
+        first = self._submit(func, args_list[0], wait=False)
+        return self._map_results(func, first, args_list[1:])
+
+    def _map_results(self, func, first, args_list):
+        pending = deque([first])
+        try:
+            for args in args_list:
+                if len(pending) >= max(1, self.workers):
+                    yield self._result(pending.popleft(), timeout=self.timeout)
+                pending.append(self._submit(func, args, wait=True))
+            while pending:
+                yield self._result(pending.popleft(), timeout=self.timeout)
+        finally:
+            # Also reached when the client disconnects: renders not started yet give their slots back
+            for future in pending:
+                future.cancel()
+
+    def _submit(self, func, args, wait):
+        acquired = self._slots.acquire() if wait else self._slots.acquire(blocking=False)
+        if not acquired:
+            raise RenderServiceBusy("Too many documents are being generated, please try again shortly.",
+                                    self.retry_after)
+
+        if not self.workers:
+            future = Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._slots.release()
+            return future
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _result(self, future, timeout=None):
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise RenderTimeout("Generating the document is taking longer than expected, please try again shortly.",
+                                self.retry_after)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool for the next render
+            self._reset_executor()
+            raise RenderServiceBusy("The document service is restarting, please try again shortly.",
+                                    self.retry_after)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=render_workers.init_render_worker,
+                    # Replacing workers now and then hands memory fragmented by large renders back to the OS
+                    max_tasks_per_child=self.max_tasks_per_worker or None,
+                )
+                # Start the processes now so the first downloads don't pay for Django setup
+                for _ in range(self.workers):
+                    self._executor.submit(render_workers.ping)
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        self._reset_executor()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_render_service():
+    """The render service of this web process, created on first use from the RENDER_* settings."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RenderService(
+                workers=settings.RENDER_WORKERS,
+                queue_depth=settings.RENDER_QUEUE_DEPTH,
+                timeout=settings.RENDER_TIMEOUT,
+                retry_after=settings.RENDER_RETRY_AFTER,
+                max_tasks_per_worker=settings.RENDER_WORKER_MAX_TASKS,
+            )
+        return _service
@@ -0,0 +1,46 @@
+"""
+Entry points for rendering processes. Spawned processes unpickle these functions before Django is
+set up, so nothing in this module may import models at module level.
+"""
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def init_render_worker():
+    """
+    Set up Django, cap the process's memory and do the per-process work every render would
+    otherwise repeat.
+    """
+    init_worker()
+    import resource
+    from django.conf import settings
+    from reportlab.pdfbase import pdfmetrics
+    from apps.evaluations.utils import _first_page_layout
+    from apps.logbooks.utils import logbook_styles
+
+    if settings.RENDER_WORKER_MEMORY_LIMIT:
+        # Past the ceiling a render fails with MemoryError instead of growing the host's memory use
+        limit = settings.RENDER_WORKER_MEMORY_LIMIT * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    for font in ('Helvetica', 'Helvetica-Bold', 'Helvetica-Oblique', 'Helvetica-BoldOblique'):
+        pdfmetrics.getFont(font)
+    logbook_styles()
+    _first_page_layout()
+
+
+def ping():
+    return True
+
+
+def render_logbook_pdf(logbook_id):
+    from apps.logbooks.utils import render_cached_logbook_pdf
+    return render_cached_logbook_pdf(logbook_id)
+
+
+def render_evaluation_pdf(evaluation_id):
+    from apps.evaluations.utils import render_cached_evaluation_pdf
+    return render_cached_evaluation_pdf(evaluation_id)
@@ -0,0 +1,67 @@
+"""
+Per-process cache of parsed student keys. Decrypting a private key with Fernet and parsing it
+costs more than the signature itself, and the same students sign and get verified over and over,
+so the signature backend's loaded key objects are kept for SIGNING_KEY_CACHE_TTL seconds.
+
+Entries are keyed by backend, student id and a fingerprint of the stored key, so a replaced key is
+never served from the cache; `forget_student_keys` drops a student's entries straight away.
+"""
+import hashlib
+import threading
+
+from cachetools import TTLCache
+from django.conf import settings
+
+from apps.utils.signatures import get_signature_backend
+
+_lock = threading.Lock()
+_signing_keys = TTLCache(maxsize=settings.SIGNING_KEY_CACHE_SIZE, ttl=settings.SIGNING_KEY_CACHE_TTL)
+_verifying_keys = TTLCache(maxsize=settings.SIGNING_KEY_CACHE_SIZE, ttl=settings.SIGNING_KEY_CACHE_TTL)
+
+
+def key_fingerprint(stored_key):
+    return hashlib.sha256(stored_key.encode()).hexdigest()[:16]
+
+
+def _cached(cache, key, load):
+    with _lock:
+        value = cache.get(key)
+    if value is None:
+        # Loaded outside the lock; two threads may both load a cold key, which is harmless
+        value = load()
+        with _lock:
+            cache[key] = value
+    return value
+
+
+def signing_key(student, backend=None):
+    """The student's private key, decrypted by `Student.get_private_key` and loaded by `backend`."""
+    backend = backend or get_signature_backend()
+    if not student.encrypted_private_key:
+        raise ValueError("No encrypted private key stored.")
+    return _cached(
+        _signing_keys, (backend.name, student.id, key_fingerprint(student.encrypted_private_key)),
+        lambda: backend.load_signing_key(bytes.fromhex(student.get_private_key()))
+    )
+
+
+def verifying_key(student, backend=None):
+    """The student's public key loaded by `backend`."""
+    backend = backend or get_signature_backend()
+    return _cached(
+        _verifying_keys, (backend.name, student.id, key_fingerprint(student.public_key)),
+        lambda: backend.load_verifying_key(bytes.fromhex(student.public_key))
+    )
+
+
+def forget_student_keys(student_id):
+    with _lock:
+        for cache in (_signing_keys, _verifying_keys):
+            for key in [key for key in cache if key[1] == student_id]:
+                cache.pop(key, None)
+
+
+def clear_key_cache():
+    with _lock:
+        _signing_keys.clear()
+        _verifying_keys.clear()
@@ -0,0 +1,52 @@
+import json
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from apps.internships.models import Internship
+
+
+@pytest.mark.django_db
+def test_rendering_benchmark_compares_against_baseline(settings, tmp_path):
+    settings.DEBUG = True
+    results = tmp_path / 'rendering.json'
+    call_command('benchmark_rendering', '--weeks', '4', '--rounds', '1', '--no-baseline', '--output', str(results),
+                 stdout=StringIO())
+    data = json.loads(results.read_text())
+    assert set(data['results']) == {'logbook_pdf_4w', 'report_docx_4w', 'evaluation_pdf'}
+    assert data['results']['logbook_pdf_4w']['output_size'] > 0
+    # Nothing synthesised is kept
+    assert not Internship.objects.exists()
+
+    # Output that grew by half is reported as a regression; timings far off the baseline are not, by default
+    for result in data['results'].values():
+        result['output_size'] = int(result['output_size'] / 1.5)
+        result['wall_time'] /= 1000
+    results.write_text(json.dumps(data))
+    with pytest.raises(CommandError, match='logbook_pdf_4w output_size') as regressions:
+        call_command('benchmark_rendering', '--weeks', '4', '--rounds', '1', '--baseline', str(results),
+                     stdout=StringIO())
+    assert 'wall_time' not in str(regressions.value)
+    with pytest.raises(CommandError, match='logbook_pdf_4w wall_time'):
+        call_command('benchmark_rendering', '--weeks', '4', '--rounds', '1', '--baseline', str(results),
+                     '--time-tolerance', '0.25', stdout=StringIO())
+    # Word reports have no peak memory: lxml allocates outside tracemalloc's view
+    assert data['results']['report_docx_4w']['peak_memory'] is None
+
+
+@pytest.mark.django_db
+def test_rendering_benchmark_compares_against_the_committed_baseline_and_needs_debug(settings):
+    from apps.utils.management.commands.benchmark_rendering import DEFAULT_BASELINE
+
+    with open(DEFAULT_BASELINE) as f:
+        assert 'logbook_pdf_52w' in json.load(f)['results']
+
+    with pytest.raises(CommandError, match='DEBUG'):
+        call_command('benchmark_rendering', '--weeks', '4', '--rounds', '1', stdout=StringIO())
+
+    # Only output size and memory are compared by default: timings depend on the machine
+    output = StringIO()
+    call_command('benchmark_rendering', '--weeks', '4', '--rounds', '1', '--force', '--memory-tolerance', '1',
+                 stdout=output)
+    assert 'for information only' in output.getvalue()
+    assert 'logbook_pdf_4w' in output.getvalue()
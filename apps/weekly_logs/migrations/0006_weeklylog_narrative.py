@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weekly_logs', '0005_alter_weeklylog_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weeklylog',
+            name='narrative',
+            field=models.TextField(blank=True),
+        ),
+    ]
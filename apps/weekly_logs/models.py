@@ -16,6 +16,7 @@ class WeeklyLog(BaseModel):
     week_no = models.PositiveIntegerField(editable=False)
     logbook = models.ForeignKey(Logbook, on_delete=models.CASCADE, related_name='weekly_logs')
     comment = models.TextField(max_length=500, blank=True)
+    narrative = models.TextField(blank=True)  # AI-written paragraph for the report, generated on approval
 
     class Meta:
         constraints = [
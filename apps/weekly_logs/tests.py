@@ -1,3 +1,40 @@
-from django.test import TestCase
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from apps.internships.models import ReportJob
+from apps.utils.internship_report import InternshipReportBuilder, REPORT_SECTIONS, report_internships
+from apps.weekly_logs.models import WeeklyLog
 
-# Create your tests here.
+
+@pytest.mark.django_db
+def test_approving_week_queues_narrative(client, completed_internship, gemini):
+    week = WeeklyLog.objects.get(logbook__internship=completed_internship)
+    response = client.post('/api/auth/login/', {"email": "supervisor@techcorp.com", "password": "password123"})
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    response = client.patch(f'/api/weekly-logs/{week.id}/{week.logbook_id}/update/', {"status": "approved"},
+                            format='json')
+
+    assert response.status_code == 200
+    job = ReportJob.objects.get(kind='week_narrative')
+    assert job.weekly_log_id == week.id
+
+    gemini.GenerativeModel.return_value.generate_content.return_value.text = "This week I built the login API."
+    call_command('process_report_jobs', '--once', stdout=StringIO())
+
+    job.refresh_from_db()
+    week.refresh_from_db()
+    assert job.status == 'completed'
+    assert week.narrative == "This week I built the login API."
+
+
+@pytest.mark.django_db
+def test_report_assembles_activities_from_narratives(completed_internship, gemini):
+    WeeklyLog.objects.filter(logbook__internship=completed_internship).update(narrative="I built the login API.")
+    generate_content = gemini.GenerativeModel.return_value.generate_content
+
+    builder = InternshipReportBuilder(report_internships().get(id=completed_internship.id))
+    sections = builder.generate_sections()
+
+    assert sections['activities'] == "### Week 5\nI built the login API."
+    assert generate_content.call_count == len(REPORT_SECTIONS) - 1
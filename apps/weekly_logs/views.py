@@ -8,6 +8,7 @@ from rest_framework import status
 from apps.weekly_logs.models import WeeklyLog
 from apps.logbooks.models import Logbook
 from apps.weekly_logs.serializers import WeeklyLogSerializer
+from apps.utils.internship_report import queue_week_narrative
 
 
 class WeeklyLogListView(APIView):
@@ -104,9 +105,13 @@ class WeeklyLogUpdateView(APIView):
                 }
             )
 
+            was_approved = weekly_log.status == 'approved'
             try:
                 serializer.is_valid(raise_exception=True)
                 serializer.save()
+                if not was_approved and weekly_log.status == 'approved':
+                    # The week is frozen now, so its report narrative can be written in the background
+                    queue_week_narrative(weekly_log)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             except (ValidationError, DRFValidationError) as e:
                 error_detail = e.detail if hasattr(e, 'detail') else str(e)
@@ -7,6 +7,32 @@ from apps.companies.models import Company, CompanyAdmin
 from apps.supervisors.models import Supervisor
 from apps.academic_years.models import AcademicYear
 from apps.internships.models import InternshipRequest, Internship
+from apps.logbooks.models import Logbook
+from apps.weekly_logs.models import WeeklyLog
+from apps.logbook_entries.models import LogbookEntry
+from cryptography.fernet import Fernet
+from django.core.cache import caches
+from django.utils import timezone
+from datetime import timedelta
+
+@pytest.fixture(autouse=True)
+def llm_limits(settings):
+    # Tests run in a single process, so local memory caches are shared the way the database caches are
+    # between workers, without every test needing database access
+    settings.CACHES = {
+        alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+        for alias in settings.CACHES
+    }
+    # Every test starts with a closed circuit breaker and no rate limit on model calls
+    for alias in settings.CACHES:
+        caches[alias].clear()
+    settings.LLM_RATE_LIMIT_PER_MINUTE = 0
+
+@pytest.fixture
+def configured_caches(settings, llm_limits):
+    # The caches as deployed without Redis, database tables included, for tests of eviction between them
+    from internlog.settings import base
+    settings.CACHES = base.CACHES
 
 @pytest.fixture
 def client():
@@ -93,3 +119,35 @@ def lecturer_user(department):
         role="lecturer"
     )
     return Lecturer.objects.create(user=user, department=department, school="Science")
+
+@pytest.fixture
+def completed_internship(settings, tmp_path, student_user, company, academic_year, supervisor_user):
+    settings.FERNET_KEY = Fernet.generate_key().decode()
+    settings.MEDIA_ROOT = str(tmp_path)
+    student_user.set_private_key()
+
+    internship = Internship.objects.create(
+        student=student_user, company=company, academic_year=academic_year,
+        start_date=timezone.now() - timedelta(days=30),
+        end_date=timezone.now() + timedelta(days=1),
+        job_description="Backend developer",
+        supervisor=supervisor_user
+    )
+    logbook = Logbook.objects.create(internship=internship)
+    week = WeeklyLog.objects.create(logbook=logbook)
+    entry = LogbookEntry.objects.create(weekly_log=week, description="Built the login API")
+    entry.is_immutable = True
+    entry.save()
+    Internship.objects.filter(id=internship.id).update(status='completed')
+    internship.refresh_from_db()
+    return internship
+
+@pytest.fixture
+def gemini(mocker):
+    genai = mocker.patch('apps.utils.llm.genai')
+    response = genai.GenerativeModel.return_value.generate_content.return_value
+    response.text = "Generated **section** text"
+    response.usage_metadata.prompt_token_count = 200
+    response.usage_metadata.candidates_token_count = 50
+    response.usage_metadata.total_token_count = 250
+    return genai
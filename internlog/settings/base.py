@@ -20,6 +20,11 @@ DEBUG = os.getenv('DEBUG', default=True)
 DJANGO_ENV=os.getenv('DJANGO_ENV', default='development')
 
 FERNET_KEY = os.getenv('FERNET_KEY')
+SIGNATURE_BACKEND = os.getenv('SIGNATURE_BACKEND', 'ecdsa')  # 'ecdsa' (pure Python) or 'cryptography' (OpenSSL); signatures are interchangeable
+LOGBOOK_ENTRY_DEFERRED_SIGNING = os.getenv('LOGBOOK_ENTRY_DEFERRED_SIGNING', 'False') == 'True'  # Re-sign edited entries on approval instead of on every edit
+LOGBOOK_ENTRY_VERIFY_WORKERS = int(os.getenv('LOGBOOK_ENTRY_VERIFY_WORKERS', 4))  # Threads verifying signatures in a bulk approval
+SIGNING_KEY_CACHE_SIZE = int(os.getenv('SIGNING_KEY_CACHE_SIZE', 1024))  # Students whose parsed keys are kept per process
+SIGNING_KEY_CACHE_TTL = int(os.getenv('SIGNING_KEY_CACHE_TTL', 300))  # Seconds a decrypted key stays in memory
 
 
 # Application definition
@@ -40,6 +45,7 @@ LOCAL_APPS = [
     'apps.students',
     'apps.supervisors',
     'apps.users',
+    'apps.utils',
     'apps.weekly_logs',
 ]
 
@@ -165,6 +171,55 @@ MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
+# File downloads: 'django' streams them from Python; 'nginx' (X-Accel-Redirect) or 'sendfile' (X-Sendfile)
+# leave the transfer to the front proxy
+FILE_SERVING_BACKEND = os.getenv('FILE_SERVING_BACKEND', 'django')
+FILE_SERVING_INTERNAL_URL = os.getenv('FILE_SERVING_INTERNAL_URL', '/protected-media/')  # nginx `internal` location aliased to MEDIA_ROOT
+MEDIA_PUBLIC_DIRS = os.getenv('MEDIA_PUBLIC_DIRS', 'company_logos,profile_pics').split(',')  # Upload directories served to anonymous users under MEDIA_URL outside DEBUG
+LOGBOOK_WEEK_FRAGMENT_TTL = int(os.getenv('LOGBOOK_WEEK_FRAGMENT_TTL', 60 * 60 * 24 * 30))  # Seconds a laid-out approved week is kept in the `logbook_fragments` cache
+LOGBOOK_WEEK_FRAGMENT_DIR = os.getenv('LOGBOOK_WEEK_FRAGMENT_DIR', os.path.join(BASE_DIR, 'cache', 'logbook_weeks'))
+LOGBOOK_WEEK_FRAGMENT_MAX_ENTRIES = int(os.getenv('LOGBOOK_WEEK_FRAGMENT_MAX_ENTRIES', 20000))  # About 17 KB each; several cohorts of 12-week logbooks
+LOGBOOK_EXPORT_WORKERS = int(os.getenv('LOGBOOK_EXPORT_WORKERS', 2))  # Render processes of the export_logbooks command; the API export uses the RENDER_* pool
+
+# PDF downloads are rendered in a pool of worker processes per web process, so layout work never blocks request threads
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', 0))  # Render processes; 0 = render in the request thread
+RENDER_QUEUE_DEPTH = int(os.getenv('RENDER_QUEUE_DEPTH', 8))  # Renders running or waiting before downloads get a 503
+RENDER_TIMEOUT = int(os.getenv('RENDER_TIMEOUT', 30))  # Seconds a download waits for its render
+RENDER_RETRY_AFTER = int(os.getenv('RENDER_RETRY_AFTER', 10))  # Retry-After sent when rendering is saturated
+# Address space cap per render process in MB; 0 = none. Only applies when RENDER_WORKERS > 0: renders in
+# the request thread are bounded by LOGBOOK_RENDER_MAX_PAGES alone
+RENDER_WORKER_MEMORY_LIMIT = int(os.getenv('RENDER_WORKER_MEMORY_LIMIT', 512))
+RENDER_WORKER_MAX_TASKS = int(os.getenv('RENDER_WORKER_MAX_TASKS', 200))  # Renders before a process is replaced; 0 = never
+LOGBOOK_RENDER_SPOOL_SIZE = int(os.getenv('LOGBOOK_RENDER_SPOOL_SIZE', 2 * 1024 * 1024))  # Bytes of a rendered logbook kept in memory before spilling to disk
+LOGBOOK_RENDER_MAX_PAGES = int(os.getenv('LOGBOOK_RENDER_MAX_PAGES', 1000))  # Pages a logbook render may reach before failing with MemoryError; 0 = none
+
+# Caches shared by the web, report worker and render processes, so neither may be per process: Redis when
+# REDIS_URL is set, otherwise database tables (created by `migrate`, or `python manage.py createcachetable`).
+# `llm_state` holds the LLM circuit breaker and rate limiter. Its keys never expire and evicting one closes an
+# open breaker or refills the token bucket, so it is kept apart from bulk data and never culled: a few keys
+# per model, well under its MAX_ENTRIES. With Redis, run the server with a maxmemory-policy that spares keys
+# without a TTL (noeviction or a volatile-* policy).
+# `logbook_fragments` holds laid-out logbook weeks: bulk data that would otherwise fill the default cache and
+# have it culled constantly. It is a directory of files on the host the web and render processes share.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL},
+        'llm_state': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL,
+                      'KEY_PREFIX': 'llm-state'},
+    }
+else:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache_table'},
+        'llm_state': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'llm_state_cache_table',
+                      'OPTIONS': {'MAX_ENTRIES': 1000000}},
+    }
+CACHES['logbook_fragments'] = {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': LOGBOOK_WEEK_FRAGMENT_DIR,
+    'TIMEOUT': LOGBOOK_WEEK_FRAGMENT_TTL,
+    'OPTIONS': {'MAX_ENTRIES': LOGBOOK_WEEK_FRAGMENT_MAX_ENTRIES},
+}
 
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = False
@@ -177,3 +232,32 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER)
+
+
+# Internship report generation
+REPORT_JOB_POLL_INTERVAL = int(os.getenv('REPORT_JOB_POLL_INTERVAL', 5))  # Seconds between queue polls
+REPORT_JOB_STALE_AFTER = int(os.getenv('REPORT_JOB_STALE_AFTER', 1800))  # Seconds before a running job is requeued
+REPORT_JOB_QUEUE_WINDOW = int(os.getenv('REPORT_JOB_QUEUE_WINDOW', 1000))  # Oldest queued jobs considered for fair ordering
+REPORT_SECTION_CONCURRENCY = int(os.getenv('REPORT_SECTION_CONCURRENCY', 4))  # Parallel section requests; 1 = sequential
+REPORT_SECTION_TIMEOUT = int(os.getenv('REPORT_SECTION_TIMEOUT', 60))  # Seconds allowed per section request
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', 50 * 1024 * 1024))  # Cached response text kept before LRU eviction
+REPORT_GENERATION_MODE = os.getenv('REPORT_GENERATION_MODE', 'per_section')  # 'per_section' or 'structured' (one JSON call)
+REPORT_STRUCTURED_TIMEOUT = int(os.getenv('REPORT_STRUCTURED_TIMEOUT', 180))  # Seconds allowed for the single JSON call
+REPORT_WEEKLY_LOGS_TOKEN_BUDGET = int(os.getenv('REPORT_WEEKLY_LOGS_TOKEN_BUDGET', 3000))  # Size of the weekly digest fed to chapter prompts
+REPORT_PREGENERATE_WEEK_NARRATIVES = os.getenv('REPORT_PREGENERATE_WEEK_NARRATIVES', 'True') == 'True'  # Queue a narrative when a week is approved
+
+# LLM backend: 'gemini' or 'fake' (local stand-in for load tests and CI)
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini')
+FAKE_LLM_LATENCY = float(os.getenv('FAKE_LLM_LATENCY', 0))  # Seconds per call
+FAKE_LLM_JITTER = float(os.getenv('FAKE_LLM_JITTER', 0))  # +/- seconds added to the latency
+FAKE_LLM_ERROR_RATE = float(os.getenv('FAKE_LLM_ERROR_RATE', 0))  # Share of calls failing with a 500 error
+FAKE_LLM_RATE_LIMIT_RATE = float(os.getenv('FAKE_LLM_RATE_LIMIT_RATE', 0))  # Share of calls answered with a 429
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 3))  # Retries for transient errors (429, timeouts, 5xx)
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', 1.0))  # Seconds; doubled on every retry, with jitter
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', 20.0))
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', 5))  # Consecutive transient failures before opening
+LLM_BREAKER_RESET_TIMEOUT = int(os.getenv('LLM_BREAKER_RESET_TIMEOUT', 60))  # Seconds the breaker stays open
+# Calls per minute across all web and report worker processes together; 0 = unlimited. The token bucket
+# lives in the shared `llm_state` cache (Redis, or its own database cache table), never in per-process memory.
+LLM_RATE_LIMIT_PER_MINUTE = float(os.getenv('LLM_RATE_LIMIT_PER_MINUTE', 60))
+LLM_RATE_LIMIT_BURST = int(os.getenv('LLM_RATE_LIMIT_BURST', 10))  # Calls allowed at once after an idle period
@@ -20,3 +20,6 @@ DATABASES = {
 
 # Connection pooling
 DATABASES['default']['CONN_MAX_AGE'] = 300
+
+# Render PDFs out of the request threads
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', 2))
@@ -15,9 +15,9 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
+from apps.utils.file_serving import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -35,4 +35,8 @@ urlpatterns = [
     path('api/logbook-entries/', include('apps.logbook_entries.urls')),
     path('api/logbook-entry-photos/', include('apps.logbook_entry_photos.urls')),
     path('api/evaluations/', include('apps.evaluations.urls'))
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+# Media is served by Django in development, or through the front proxy when one is configured
+if settings.DEBUG or settings.FILE_SERVING_BACKEND != 'django':
+    urlpatterns += [re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>.*)$", serve_media)]